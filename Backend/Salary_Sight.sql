@@ -86,6 +86,82 @@ CREATE INDEX idx_salary_person_no ON salaryregister(person_no);
 CREATE INDEX idx_salary_personnel_area ON salaryregister(personnel_area);
 CREATE INDEX idx_salary_year ON salaryregister(year);
 
+-- Monthly rollup per (year, month, personnel_area), one row per measure.
+-- Maintained incrementally by the upload path; served by /salary/summary
+CREATE TABLE IF NOT EXISTS salary_monthly_summary (
+    year             INT NOT NULL,
+    month_year       DATE NOT NULL,
+    personnel_area   VARCHAR(100) NOT NULL,
+    measure          VARCHAR(64) NOT NULL,
+    total            DECIMAL(20,2),
+    row_count        INT NOT NULL,
+    updated_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (year, month_year, personnel_area, measure)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Upload manifest: file hashes of processed uploads, the row-set hash per
+-- (year, month, area) partition and the content hash of every stored row.
+-- Identical re-uploads short-circuit; changed files only write differing rows
+CREATE TABLE IF NOT EXISTS upload_manifest (
+    file_hash        CHAR(64) NOT NULL,
+    filename         VARCHAR(255),
+    `rows`           INT NOT NULL,
+    years            VARCHAR(255),
+    uploaded_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (file_hash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS upload_partition_manifest (
+    year             INT NOT NULL,
+    month_year       DATE NOT NULL,
+    personnel_area   VARCHAR(100) NOT NULL,
+    partition_hash   CHAR(16) NOT NULL,
+    row_count        INT NOT NULL,
+    updated_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (year, month_year, personnel_area)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS salary_row_hashes (
+    year             INT NOT NULL,
+    person_no        VARCHAR(100) NOT NULL,
+    personnel_area   VARCHAR(100) NOT NULL,
+    month_year       DATE NOT NULL,
+    row_hash         CHAR(64) NOT NULL,
+
+    PRIMARY KEY (year, person_no, personnel_area, month_year),
+    KEY idx_row_hash_partition (year, month_year, personnel_area)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Latest employee_master row per employee (maintained when EMPLOYEE_CURRENT_ENABLED=true)
+CREATE TABLE IF NOT EXISTS employee_current LIKE employee_master;
+ALTER TABLE employee_current DROP PRIMARY KEY, ADD PRIMARY KEY (person_no, personnel_area);
+
+-- Narrow pay-head storage used when SALARY_STORAGE_MODE=components: year tables
+-- keep identity columns (+ JSON attributes), each numeric pay head is one row here
+CREATE TABLE IF NOT EXISTS salary_components (
+    person_no        VARCHAR(100) NOT NULL,
+    personnel_area   VARCHAR(100) NOT NULL,
+    month_year       DATE NOT NULL,
+    component        VARCHAR(64) NOT NULL,
+    amount           DECIMAL(15,2),
+
+    PRIMARY KEY (person_no, personnel_area, month_year, component),
+    KEY idx_component_month (component, month_year, personnel_area)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Version stamp per salary year, bumped by every upload; Parquet snapshots
+-- of closed years are keyed by it
+CREATE TABLE IF NOT EXISTS salary_year_versions (
+    year             INT NOT NULL,
+    version          BIGINT NOT NULL DEFAULT 0,
+    updated_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (year)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Verify tables created
 SHOW TABLES;
 
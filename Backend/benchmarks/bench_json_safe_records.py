@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: per-cell vs column-wise json_safe_records
+
+Checks that both versions produce identical records, then times them.
+Usage (from Backend/, with .env present so main imports):
+    python benchmarks/bench_json_safe_records.py --rows 50000 --columns 100
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from main import json_safe_records
+
+
+def legacy_json_safe_records(df: pd.DataFrame):
+    """Per-cell implementation json_safe_records replaced"""
+    df = df.replace([np.inf, -np.inf], np.nan)
+    records = df.to_dict(orient="records")
+
+    for record in records:
+        for key, value in list(record.items()):
+            if pd.isna(value) or value is np.nan or (isinstance(value, float) and np.isnan(value)):
+                record[key] = None
+            elif isinstance(value, (np.integer, np.floating)):
+                if np.isnan(value) or np.isinf(value):
+                    record[key] = None
+                else:
+                    record[key] = value.item()
+
+    return records
+
+
+def make_frame(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {
+        "person_no": [f"P{i:07d}" for i in range(rows)],
+        "personnel_area": rng.choice(["AREA01", "AREA02", None], rows),
+        "month_year": ["2025-01-01"] * rows,
+        "year": np.full(rows, 2025),
+        "mixed": pd.Series([np.float64(1.5), "x", None, np.int64(3)] * (rows // 4 + 1), dtype=object)[:rows].values,
+    }
+    for c in range(columns):
+        values = rng.normal(1000, 200, rows).round(2)
+        values[rng.random(rows) < 0.4] = np.nan
+        values[rng.random(rows) < 0.001] = np.inf
+        data[f"pay_head_{c}"] = values
+    return pd.DataFrame(data)
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:8.3f}s")
+    return result, elapsed
+
+
+def same_records(left, right) -> bool:
+    if len(left) != len(right):
+        return False
+    for a, b in zip(left, right):
+        if a.keys() != b.keys():
+            return False
+        for key in a:
+            if type(a[key]) is not type(b[key]) or a[key] != b[key]:
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--columns", type=int, default=100)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.columns)
+    before, legacy_time = timed("per-cell", lambda: legacy_json_safe_records(df))
+    after, new_time = timed("column-wise", lambda: json_safe_records(df))
+
+    print(f"identical output: {same_records(before, after)}")
+    print(f"speedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: per-row REPLACE INTO vs bulk INSERT ... ON DUPLICATE KEY UPDATE
+
+Runs against the database configured in .env (local MySQL/MariaDB).
+Usage (from Backend/):
+    python benchmarks/bench_salary_insert.py --rows 20000 --columns 60
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from db import SessionLocal
+from db_utils import bulk_upsert, SALARY_KEY_COLUMNS
+
+TABLE_NAME = "bench_salaryregister"
+
+
+def make_records(rows: int, columns: int):
+    records = []
+    for i in range(rows):
+        record = {
+            "person_no": f"P{i:07d}",
+            "personnel_area": f"AREA{i % 25:02d}",
+            "month_year": "2025-01-01",
+            "year": 2025,
+        }
+        for c in range(columns):
+            record[f"pay_head_{c}"] = round(i * 0.5 + c, 2)
+        records.append(record)
+    return records
+
+
+def reset_table(columns: int):
+    session = SessionLocal()
+    try:
+        pay_heads = ",\n".join([f"`pay_head_{c}` DECIMAL(15,2) NULL" for c in range(columns)])
+        session.execute(text(f"DROP TABLE IF EXISTS `{TABLE_NAME}`"))
+        session.execute(text(f"""
+            CREATE TABLE `{TABLE_NAME}` (
+                `person_no` VARCHAR(100) NOT NULL,
+                `personnel_area` VARCHAR(100) NOT NULL,
+                `month_year` DATE NOT NULL,
+                `year` INT NULL,
+                {pay_heads},
+                PRIMARY KEY (`person_no`, `personnel_area`, `month_year`)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """))
+        session.commit()
+    finally:
+        session.close()
+
+
+def legacy_replace(records):
+    session = SessionLocal()
+    try:
+        for record in records:
+            columns = ", ".join([f"`{k}`" for k in record.keys()])
+            placeholders = ", ".join([f":{k}" for k in record.keys()])
+            session.execute(text(f"REPLACE INTO `{TABLE_NAME}` ({columns}) VALUES ({placeholders})"), record)
+        session.commit()
+    finally:
+        session.close()
+
+
+def bulk(records, chunk_size):
+    session = SessionLocal()
+    try:
+        bulk_upsert(session, TABLE_NAME, records, SALARY_KEY_COLUMNS, chunk_size)
+        session.commit()
+    finally:
+        session.close()
+
+
+def timed(label, fn, rows):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:8.2f}s  {rows / elapsed:12,.0f} rows/sec")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=60)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    records = make_records(args.rows, args.columns)
+
+    reset_table(args.columns)
+    before = timed("per-row REPLACE INTO", lambda: legacy_replace(records), args.rows)
+
+    reset_table(args.columns)
+    after = timed(f"bulk upsert (chunk={args.chunk_size})", lambda: bulk(records, args.chunk_size), args.rows)
+
+    session = SessionLocal()
+    try:
+        session.execute(text(f"DROP TABLE IF EXISTS `{TABLE_NAME}`"))
+        session.commit()
+    finally:
+        session.close()
+
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Load test: concurrent dashboard reads against a running API
+
+Start one uvicorn worker, once with the async engine and once without:
+    uvicorn main:app --workers 1                        # async reads (aiomysql)
+    ASYNC_DB_ENABLED=false uvicorn main:app --workers 1 # sync engine in threads
+then compare throughput and latency:
+    python benchmarks/load_read_endpoints.py --url http://127.0.0.1:8000 \\
+        --path /employee/1001/AREA1 --path "/salary/all/$(date +%Y)?limit=100" --concurrency 200 --requests 5000
+
+Without --path, pages of the current year's salary register are read: past years
+may be answered from the Parquet snapshot cache and /employee-master/stats from
+an in-process cache, neither of which exercises the database.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, paths, queue: asyncio.Queue, latencies: list, errors: list):
+    while True:
+        try:
+            i = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        path = paths[i % len(paths)]
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, paths, concurrency: int, requests: int):
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, paths, queue, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"requests: {len(latencies)}  errors: {len(errors)}  concurrency: {concurrency}")
+    print(f"throughput: {len(latencies) / elapsed:,.1f} req/s over {elapsed:.2f}s")
+    print(f"latency ms: p50 {statistics.median(latencies) * 1000:.1f}  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}  "
+          f"max {latencies[-1] * 1000:.1f}")
+
+    pool = httpx.get(f"{url}/db/pool").json().get("pool")
+    print(f"pool: {pool}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--year", type=int, default=date.today().year)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    paths = args.paths or [f"/salary/all/{args.year}?limit={args.limit}"]
+    asyncio.run(run(args.url, paths, args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+from sqlalchemy import text
+from db import session_scope
+from db_utils import (
+    bulk_upsert,
+    table_exists,
+    get_table_columns,
+    invalidate_schema_cache,
+    ensure_summary_table,
+    summary_measures,
+    _in_clause,
+    SALARY_KEY_COLUMNS,
+    MASTER_TO_SALARY_FIELDS,
+    MASTER_LOOKUP_CHUNK_SIZE,
+    SUMMARY_TABLE,
+    SUMMARY_ROW_COUNT,
+)
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import json
+import os
+
+# "wide": every pay head is a column of salaryregister{year} (default).
+# "components": year tables keep only CORE_COLUMNS; numeric pay heads go to
+# salary_components as one row per head, other extra columns to a JSON column.
+SALARY_STORAGE_MODE = os.getenv("SALARY_STORAGE_MODE", "wide").strip().lower()
+
+COMPONENTS_TABLE = "salary_components"
+ATTRIBUTES_COLUMN = "attributes"
+
+# Identity columns kept on the year table in components mode (plus SALARY_CORE_COLUMNS extras)
+CORE_COLUMNS = list(dict.fromkeys(
+    SALARY_KEY_COLUMNS + ["year"] + MASTER_TO_SALARY_FIELDS
+    + [c.strip() for c in os.getenv("SALARY_CORE_COLUMNS", "").split(",") if c.strip()]
+))
+
+
+def components_enabled() -> bool:
+    return SALARY_STORAGE_MODE == "components"
+
+
+def ensure_components_table(session):
+    """Create salary_components if it does not exist yet"""
+    if table_exists(COMPONENTS_TABLE):
+        return
+    session.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS `{COMPONENTS_TABLE}` (
+            `person_no` VARCHAR(100) NOT NULL,
+            `personnel_area` VARCHAR(100) NOT NULL,
+            `month_year` DATE NOT NULL,
+            `component` VARCHAR(64) NOT NULL,
+            `amount` DECIMAL(15,2) NULL,
+            PRIMARY KEY (`person_no`, `personnel_area`, `month_year`, `component`),
+            KEY idx_component_month (`component`, `month_year`, `personnel_area`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    invalidate_schema_cache(COMPONENTS_TABLE)
+
+
+def core_column_definitions(column_types: Dict[str, str]) -> Dict[str, str]:
+    """Restrict inferred year-table columns to the core set and add the JSON attributes column"""
+    core = {col: col_type for col, col_type in column_types.items() if col in CORE_COLUMNS}
+    core[ATTRIBUTES_COLUMN] = "JSON"
+    return core
+
+
+def _is_amount(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def split_components(records: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Split wide salary records into core rows for the year table and narrow
+    (person_no, personnel_area, month_year, component, amount) rows.
+    Non-numeric extra values are kept on the core row as JSON attributes; NULLs are dropped.
+    """
+    core_rows = []
+    component_rows = []
+    for record in records:
+        core = {}
+        attributes = {}
+        key = {c: record.get(c) for c in SALARY_KEY_COLUMNS}
+        for col, value in record.items():
+            if col in CORE_COLUMNS:
+                core[col] = value
+            elif value is None:
+                continue
+            elif _is_amount(value):
+                component_rows.append({**key, "component": col, "amount": value})
+            else:
+                attributes[col] = value
+        core[ATTRIBUTES_COLUMN] = json.dumps(attributes, default=str) if attributes else None
+        core_rows.append(core)
+    return core_rows, component_rows
+
+
+def write_components(session, records: List[Dict], component_rows: List[Dict]) -> int:
+    """
+    Replace the components of the given salary rows and refresh their summary
+    measures. The caller commits.
+    """
+    if not records:
+        return 0
+    ensure_components_table(session)
+
+    # A re-sent row may have dropped a pay head, so its old components go first
+    keys = list(dict.fromkeys(tuple(record.get(c) for c in SALARY_KEY_COLUMNS) for record in records))
+    for start in range(0, len(keys), MASTER_LOOKUP_CHUNK_SIZE):
+        params: Dict = {}
+        in_sql = _in_clause("k", keys[start:start + MASTER_LOOKUP_CHUNK_SIZE], params)
+        session.execute(text(f"""
+            DELETE FROM `{COMPONENTS_TABLE}`
+            WHERE (person_no, personnel_area, month_year) IN ({in_sql})
+        """), params)
+
+    written = bulk_upsert(session, COMPONENTS_TABLE, component_rows, SALARY_KEY_COLUMNS + ["component"])
+    touched = {(record.get("month_year"), record.get("personnel_area")) for record in records}
+    refresh_component_summary(session, touched)
+    return written
+
+
+def refresh_component_summary(session, touched: Set[tuple]) -> int:
+    """
+    Recompute the per-component measures of salary_monthly_summary for the given
+    (month_year, area) groups. Component measures of those groups are deleted first,
+    so a pay head no longer present in a group stops being reported; the year table's
+    own measures (CORE_COLUMNS and the row count) are left alone.
+    """
+    ensure_summary_table(session)
+    groups = list(touched)
+    keep = CORE_COLUMNS + [SUMMARY_ROW_COUNT]
+    summary_rows = []
+    for start in range(0, len(groups), MASTER_LOOKUP_CHUNK_SIZE):
+        params: Dict = {f"keep{i}": measure for i, measure in enumerate(keep)}
+        in_sql = _in_clause("g", groups[start:start + MASTER_LOOKUP_CHUNK_SIZE], params)
+        session.execute(text(f"""
+            DELETE FROM `{SUMMARY_TABLE}`
+            WHERE (month_year, personnel_area) IN ({in_sql})
+              AND measure NOT IN ({", ".join(f":keep{i}" for i in range(len(keep)))})
+        """), params)
+        query = text(f"""
+            SELECT YEAR(month_year) AS year, month_year, personnel_area, component,
+                   SUM(amount) AS total, COUNT(*) AS row_count
+            FROM `{COMPONENTS_TABLE}`
+            WHERE (month_year, personnel_area) IN ({in_sql})
+            GROUP BY month_year, personnel_area, component
+        """)
+        for row in session.execute(query, params).mappings():
+            if not summary_measures([row["component"]]):
+                continue
+            summary_rows.append({
+                "year": row["year"], "month_year": row["month_year"], "personnel_area": row["personnel_area"],
+                "measure": row["component"], "total": row["total"], "row_count": row["row_count"]
+            })
+    return bulk_upsert(session, SUMMARY_TABLE, summary_rows, ["year", "month_year", "personnel_area", "measure"])
+
+
+def split_fields(table_name: str, fields: Optional[List[str]]) -> Tuple[Optional[List[str]], Optional[List[str]]]:
+    """
+    Split a requested projection into year-table columns and component/attribute names.
+    (None, None) means everything.
+    """
+    if not fields:
+        return None, None
+    columns = get_table_columns(table_name)
+    core = [f for f in fields if f in columns]
+    extra = [f for f in fields if f not in columns]
+    if extra:
+        core = list(dict.fromkeys(core + SALARY_KEY_COLUMNS + [ATTRIBUTES_COLUMN]))
+    return core, extra
+
+
+def _fetch_components(session, keys: List[tuple], names: Optional[List[str]]) -> Dict[tuple, Dict]:
+    found: Dict[tuple, Dict] = {}
+    for start in range(0, len(keys), MASTER_LOOKUP_CHUNK_SIZE):
+        params: Dict = {}
+        in_sql = _in_clause("k", keys[start:start + MASTER_LOOKUP_CHUNK_SIZE], params)
+        name_sql = ""
+        if names:
+            name_sql = f" AND component IN ({', '.join(f':c{i}' for i in range(len(names)))})"
+            params.update({f"c{i}": name for i, name in enumerate(names)})
+        query = text(f"""
+            SELECT person_no, personnel_area, month_year, component, amount
+            FROM `{COMPONENTS_TABLE}`
+            WHERE (person_no, personnel_area, month_year) IN ({in_sql}){name_sql}
+        """)
+        for row in session.execute(query, params):
+            found.setdefault((str(row[0]), str(row[1]), str(row[2])), {})[row[3]] = row[4]
+    return found
+
+
+def attach_components(rows: List[Dict], names: Optional[List[str]] = None,
+                      keep: Optional[List[str]] = None, session=None) -> List[Dict]:
+    """
+    Pivot stored components and JSON attributes back onto year-table rows, in place.
+    names limits the components/attributes returned; keep, when given, is the
+    full projection the caller asked for (other helper columns are dropped).
+    """
+    if not rows or names == []:
+        return rows  # nothing beyond year-table columns was asked for
+    keys = list(dict.fromkeys(tuple(str(row.get(c)) for c in SALARY_KEY_COLUMNS) for row in rows))
+    if table_exists(COMPONENTS_TABLE):
+        with session_scope(session) as session:
+            found = _fetch_components(session, keys, names)
+    else:
+        found = {}
+
+    for row in rows:
+        attributes = row.pop(ATTRIBUTES_COLUMN, None)
+        if attributes:
+            extra = json.loads(attributes) if isinstance(attributes, str) else attributes
+            row.update({k: v for k, v in extra.items() if not names or k in names})
+        row.update(found.get(tuple(str(row.get(c)) for c in SALARY_KEY_COLUMNS), {}))
+        if keep:
+            for col in [c for c in row if c not in keep]:
+                del row[col]
+    return rows
+
+
+def attach_components_stream(rows: Iterator[Dict], names: Optional[List[str]] = None,
+                             keep: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[Dict]:
+    """attach_components over a row stream, one lookup per batch_size rows"""
+    with session_scope() as session:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield from attach_components(batch, names, keep, session)
+                batch = []
+        yield from attach_components(batch, names, keep, session)
+
+
+def fiscal_year_component_totals(fy_start: int, names: Optional[List[str]] = None,
+                                 personnel_area: Optional[List[str]] = None, session=None) -> Dict[tuple, Dict]:
+    """Per-employee component sums for fiscal year fy_start-04 .. (fy_start+1)-03"""
+    if not table_exists(COMPONENTS_TABLE):
+        return {}
+    params: Dict = {"fy_from": date(fy_start, 4, 1), "fy_to": date(fy_start + 1, 4, 1)}
+    conditions = ["month_year >= :fy_from", "month_year < :fy_to"]
+    if names:
+        conditions.append(f"component IN ({', '.join(f':c{i}' for i in range(len(names)))})")
+        params.update({f"c{i}": name for i, name in enumerate(names)})
+    if personnel_area:
+        conditions.append(f"personnel_area IN ({', '.join(f':a{i}' for i in range(len(personnel_area)))})")
+        params.update({f"a{i}": area for i, area in enumerate(personnel_area)})
+    query = text(f"""
+        SELECT person_no, personnel_area, component, SUM(amount) AS total
+        FROM `{COMPONENTS_TABLE}`
+        WHERE {" AND ".join(conditions)}
+        GROUP BY person_no, personnel_area, component
+    """)
+    totals: Dict[tuple, Dict] = {}
+    with session_scope(session) as session:
+        for row in session.execute(query, params).mappings():
+            totals.setdefault((row["person_no"], row["personnel_area"]), {})[row["component"]] = row["total"]
+    return totals
+
+
+def add_fiscal_year_components(result: Dict, fy_start: int, fields: Optional[List[str]] = None,
+                               personnel_area: Optional[List[str]] = None, session=None) -> Dict:
+    """
+    Merge component totals into a get_fiscal_year_totals result, in place.
+    result must have been computed for the core fields of `fields` (or all of them).
+    """
+    names = [f for f in fields if f not in CORE_COLUMNS] if fields else None
+    if fields and not names:
+        return result
+    totals = fiscal_year_component_totals(fy_start, names, personnel_area, session)
+
+    core_fields = [f for f in fields if f in CORE_COLUMNS] if fields else result["fields"]
+    dropped = [f for f in result["fields"] if f not in core_fields]
+    component_names: Dict[str, None] = {}
+    for row in result["data"]:
+        for f in dropped:
+            row.pop(f, None)
+        sums = totals.get((row["person_no"], row["personnel_area"]), {})
+        row.update(sums)
+        component_names.update(dict.fromkeys(sums))
+    result["fields"] = core_fields + (names or sorted(component_names))
+    return result
+
+
+def component_names(year: int, session=None) -> List[str]:
+    """Distinct pay heads stored for a year (read from idx_component_month)"""
+    if not table_exists(COMPONENTS_TABLE):
+        return []
+    with session_scope(session) as session:
+        rows = session.execute(text(f"""
+            SELECT DISTINCT component FROM `{COMPONENTS_TABLE}`
+            WHERE month_year >= :year_from AND month_year < :year_to
+            ORDER BY component
+        """), {"year_from": date(year, 1, 1), "year_to": date(year + 1, 1, 1)})
+        return [row[0] for row in rows]
+
+
+def attribute_names(table_name: str, session=None) -> List[str]:
+    """Distinct keys of the JSON attributes column of a year table"""
+    if not table_exists(table_name) or ATTRIBUTES_COLUMN not in get_table_columns(table_name):
+        return []
+    names: Dict[str, None] = {}
+    with session_scope(session) as session:
+        rows = session.execute(text(f"""
+            SELECT DISTINCT CAST(JSON_KEYS(`{ATTRIBUTES_COLUMN}`) AS CHAR)
+            FROM `{table_name}` WHERE `{ATTRIBUTES_COLUMN}` IS NOT NULL
+        """))
+        for row in rows:
+            if row[0]:
+                names.update(dict.fromkeys(json.loads(row[0])))
+    return sorted(names)
@@ -1,6 +1,10 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from contextlib import asynccontextmanager, contextmanager
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,5 +14,140 @@ DATABASE_URL = (
     f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
 )
 
-engine = create_engine(DATABASE_URL, echo=False)
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle connections before MySQL's wait_timeout closes them server-side
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+_pool_stats_lock = threading.Lock()
+_pool_stats = {"checkouts": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with _pool_stats_lock:
+                _pool_stats["checkouts"] += 1
+                _pool_stats["total_wait_seconds"] += waited
+                _pool_stats["max_wait_seconds"] = max(_pool_stats["max_wait_seconds"], waited)
+
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    poolclass=TimedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 SessionLocal = sessionmaker(bind=engine)
+
+# Async engine for read endpoints (aiomysql or asyncmy). Without the driver, or
+# with ASYNC_DB_ENABLED=false, async reads fall back to the sync engine in a thread.
+ASYNC_DB_DRIVER = os.getenv("ASYNC_DB_DRIVER", "aiomysql")
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB_ENABLED", "true").lower() in ("1", "true", "yes")
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB_ENABLED:
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        async_engine = create_async_engine(
+            DATABASE_URL.replace("mysql+pymysql", f"mysql+{ASYNC_DB_DRIVER}", 1),
+            echo=False,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+        AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    except ImportError as e:
+        print(f"Async database driver unavailable, reads use the sync engine: {e}")
+
+
+@contextmanager
+def connection_session():
+    """Session pinned to one pooled connection for its whole lifetime"""
+    with engine.connect() as connection:
+        session = SessionLocal(bind=connection)
+        try:
+            yield session
+        finally:
+            session.close()
+
+
+@contextmanager
+def session_scope(session=None):
+    """Use the caller's session if given, otherwise open one and close it afterwards"""
+    if session is not None:
+        yield session
+        return
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def get_db():
+    """FastAPI dependency: one session (and connection) per request"""
+    with connection_session() as session:
+        yield session
+
+
+@asynccontextmanager
+async def async_session_scope(session=None):
+    """Async counterpart of session_scope; requires the async engine"""
+    if session is not None:
+        yield session
+        return
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def get_async_db():
+    """FastAPI dependency: one async session per request, None without the async engine"""
+    if AsyncSessionLocal is None:
+        yield None
+        return
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    with _pool_stats_lock:
+        stats = dict(_pool_stats)
+    checkouts = stats["checkouts"]
+    status = {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checkouts": checkouts,
+        "avg_wait_ms": round(stats["total_wait_seconds"] / checkouts * 1000, 3) if checkouts else 0.0,
+        "max_wait_ms": round(stats["max_wait_seconds"] * 1000, 3),
+    }
+    if async_engine is not None:
+        async_pool = async_engine.pool
+        status["async"] = {
+            "pool_size": async_pool.size(),
+            "checked_out": async_pool.checkedout(),
+            "checked_in": async_pool.checkedin(),
+            "overflow": async_pool.overflow(),
+        }
+    return status
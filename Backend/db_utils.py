@@ -1,146 +1,519 @@
 from sqlalchemy import text, inspect
-from db import SessionLocal, engine
-from typing import Dict, List, Optional, Set
+import db
+from db import engine, session_scope, async_session_scope
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from collections import OrderedDict
+import asyncio
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+# Rows per executemany batch for bulk salary register writes
+SALARY_INSERT_CHUNK_SIZE = int(os.getenv("SALARY_INSERT_CHUNK_SIZE", "1000"))
+
+# Seconds before cached table metadata is re-read (0 = until invalidated)
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "0"))
+
+_schema_lock = threading.Lock()
+# One lock per table for create/alter, shared by every upload thread of the process
+_ddl_locks: Dict[str, threading.Lock] = {}
+_table_names_cache = None
+_column_types_cache: Dict[str, tuple] = {}
+
+SALARY_KEY_COLUMNS = ["person_no", "personnel_area", "month_year"]
+
+# Secondary indexes on generated salaryregister{year} tables: ";"-separated
+# indexes of ","-separated columns. Columns a table lacks (or stores as TEXT) are skipped.
+SALARY_TABLE_INDEXES = [
+    [c.strip() for c in index.split(",") if c.strip()]
+    for index in os.getenv("SALARY_TABLE_INDEXES", "personnel_area,month_year;month_year").split(";")
+    if index.strip()
+]
+# Try ALGORITHM=INSTANT for column additions (no table rebuild where supported)
+SCHEMA_ALTER_INSTANT = os.getenv("SCHEMA_ALTER_INSTANT", "true").lower() in ("1", "true", "yes")
+# "month" = RANGE COLUMNS partitioning of each year table by month_year; empty = none
+SALARY_TABLE_PARTITIONING = os.getenv("SALARY_TABLE_PARTITIONING", "").strip().lower()
+
+EMPLOYEE_MASTER_FIELDS = [
+    "person_no", "employee_name", "designation", "month_year",
+    "for_period", "personnel_area", "personnel_subarea", 
+    "employee_group", "employee_subgroup", "pay_scale_type", 
+    "pay_scale_area", "pay_scale_group", "pay_scale_level", 
+    "bank_account_number", "ifsc_code", "pf_number", "aadhar_no", 
+    "pan_no", "profit_center", "cost_center", "basic_pay", 
+    "basic_pay_adjustment"
+]
+
+# Master columns copied onto salary records that lack them
+MASTER_TO_SALARY_FIELDS = [
+    "employee_name", "designation", "for_period", 
+    "personnel_subarea", "employee_group", "employee_subgroup", 
+    "pay_scale_type", "pay_scale_area", "pay_scale_group", 
+    "pay_scale_level", "bank_account_number", "ifsc_code", 
+    "pf_number", "aadhar_no", "pan_no", "profit_center", 
+    "cost_center", "basic_pay", "basic_pay_adjustment"
+]
+
+# Keys per tuple-IN query when looking up employee_master
+MASTER_LOOKUP_CHUNK_SIZE = 500
+
+# One row per (person_no, personnel_area) holding its latest master record,
+# kept in step with every master upsert when EMPLOYEE_CURRENT_ENABLED is set
+EMPLOYEE_CURRENT_TABLE = "employee_current"
+EMPLOYEE_CURRENT_ENABLED = os.getenv("EMPLOYEE_CURRENT_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# employee_master is keyed by (person_no, personnel_area, month_year). By default
+# every upload keeps only each employee's latest month; with EMPLOYEE_MASTER_HISTORY
+# set, one row per employee per uploaded month is kept (employee_current then
+# serves the latest card without scanning history)
+EMPLOYEE_MASTER_HISTORY = os.getenv("EMPLOYEE_MASTER_HISTORY", "false").lower() in ("1", "true", "yes")
+
+# Rows deleted per short transaction by cleanup_employee_master
+MASTER_CLEANUP_BATCH_SIZE = int(os.getenv("MASTER_CLEANUP_BATCH_SIZE", "5000"))
+
+# In-process LRU of employee cards served by lookup_employees
+EMPLOYEE_CACHE_SIZE = int(os.getenv("EMPLOYEE_CACHE_SIZE", "20000"))
+EMPLOYEE_CACHE_TTL = float(os.getenv("EMPLOYEE_CACHE_TTL", "300"))
+
+_employee_cache_lock = threading.Lock()
+_employee_cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+# Bumped by every invalidation; a lookup that raced an invalidation does not cache its result
+_employee_cache_generation = 0
+_employee_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+# Monthly rollup maintained on every salary register write
+SUMMARY_TABLE = "salary_monthly_summary"
+SUMMARY_ROW_COUNT = "_row_count"
+# Comma-separated numeric columns to roll up; empty means every numeric pay column
+SUMMARY_MEASURES = {m.strip() for m in os.getenv("SUMMARY_MEASURES", "").split(",") if m.strip()}
+# Numeric columns that are never summed when SUMMARY_MEASURES is empty: employee
+# master attributes (account, PF and Aadhaar numbers, pay scale codes...) and
+# anything named like an identifier, plus SUMMARY_EXCLUDE
+SUMMARY_EXCLUDED = (
+    set(EMPLOYEE_MASTER_FIELDS) - {"basic_pay", "basic_pay_adjustment"}
+) | {m.strip() for m in os.getenv("SUMMARY_EXCLUDE", "").split(",") if m.strip()}
+SUMMARY_IDENTIFIER_PATTERN = re.compile(r"(^|_)(no|number|num|code|id|uan)$")
+
+
+def _cache_is_fresh(loaded_at: float) -> bool:
+    """Whether a schema cache entry is still within SCHEMA_CACHE_TTL"""
+    return SCHEMA_CACHE_TTL <= 0 or (time.monotonic() - loaded_at) < SCHEMA_CACHE_TTL
+
+
+def table_ddl_lock(table_name: str) -> threading.Lock:
+    """Lock serializing schema changes of one table within this process"""
+    with _schema_lock:
+        return _ddl_locks.setdefault(table_name, threading.Lock())
+
+
+def invalidate_schema_cache(table_name: Optional[str] = None):
+    """Drop cached metadata for one table, or for every table when table_name is None"""
+    global _table_names_cache
+    with _schema_lock:
+        _table_names_cache = None
+        if table_name is None:
+            _column_types_cache.clear()
+        else:
+            _column_types_cache.pop(table_name, None)
+
+
+def _get_table_names() -> Set[str]:
+    """Cached set of table names in the database"""
+    global _table_names_cache
+    with _schema_lock:
+        if _table_names_cache and _cache_is_fresh(_table_names_cache[0]):
+            return _table_names_cache[1]
+    names = set(inspect(engine).get_table_names())
+    with _schema_lock:
+        _table_names_cache = (time.monotonic(), names)
+    return names
 
 
 def table_exists(table_name: str) -> bool:
     """Check if a table exists in the database"""
     try:
-        inspector = inspect(engine)
-        return table_name in inspector.get_table_names()
+        return table_name in _get_table_names()
     except Exception:
         return False
 
 
+def table_is_empty(table_name: str, session=None) -> bool:
+    """Whether an existing table has no rows"""
+    with session_scope(session) as session:
+        return session.execute(text(f"SELECT 1 FROM `{table_name}` LIMIT 1")).first() is None
+
+
 def get_table_columns(table_name: str) -> Set[str]:
     """Get existing columns for a specific table"""
-    try:
-        inspector = inspect(engine)
-        columns = inspector.get_columns(table_name)
-        return {col['name'] for col in columns}
-    except Exception:
-        return set()
+    return set(get_table_column_types(table_name).keys())
 
 
 def get_table_column_types(table_name: str) -> Dict[str, str]:
     """Get column names and their data types for a specific table"""
+    with _schema_lock:
+        cached = _column_types_cache.get(table_name)
+        if cached and _cache_is_fresh(cached[0]):
+            return dict(cached[1])
     try:
         inspector = inspect(engine)
         columns = inspector.get_columns(table_name)
-        return {col['name']: str(col['type']) for col in columns}
+        column_types = {col['name']: str(col['type']) for col in columns}
     except Exception:
         return {}
+    with _schema_lock:
+        _column_types_cache[table_name] = (time.monotonic(), column_types)
+    return dict(column_types)
 
 
-def get_employee_from_master(person_no: str, personnel_area: str) -> Optional[Dict]:
-    """Get employee details from employee_master table"""
-    session = SessionLocal()
+def _async_reads_enabled(session) -> bool:
+    """Whether an async read can run natively, rather than on the sync engine in a thread"""
+    return session is not None or db.AsyncSessionLocal is not None
+
+
+async def _get_table_names_async() -> Set[str]:
+    global _table_names_cache
+    with _schema_lock:
+        if _table_names_cache and _cache_is_fresh(_table_names_cache[0]):
+            return _table_names_cache[1]
+    if db.async_engine is None:
+        return await asyncio.to_thread(_get_table_names)
+    async with db.async_engine.connect() as conn:
+        names = set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+    with _schema_lock:
+        _table_names_cache = (time.monotonic(), names)
+    return names
+
+
+async def table_exists_async(table_name: str) -> bool:
+    """Async table_exists; shares the schema cache"""
     try:
-        query = text("""
-            SELECT * FROM employee_master 
-            WHERE person_no = :person_no AND personnel_area = :personnel_area
-            LIMIT 1
-        """)
-        result = session.execute(query, {"person_no": person_no, "personnel_area": personnel_area})
-        row = result.fetchone()
-        if row:
-            return dict(row._mapping)
-        return None
+        return table_name in await _get_table_names_async()
     except Exception:
-        return None
-    finally:
-        session.close()
+        return False
 
 
-def get_all_employees_from_master() -> Dict:
-    """Get ALL employees from employee_master table as a lookup dictionary"""
-    session = SessionLocal()
+async def get_table_column_types_async(table_name: str) -> Dict[str, str]:
+    """Async get_table_column_types; shares the schema cache"""
+    with _schema_lock:
+        cached = _column_types_cache.get(table_name)
+        if cached and _cache_is_fresh(cached[0]):
+            return dict(cached[1])
+    if db.async_engine is None:
+        return await asyncio.to_thread(get_table_column_types, table_name)
     try:
-        query = text("SELECT * FROM employee_master")
-        result = session.execute(query)
-        lookup = {}
-        for row in result:
+        async with db.async_engine.connect() as conn:
+            columns = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_columns(table_name))
+        column_types = {col['name']: str(col['type']) for col in columns}
+    except Exception:
+        return {}
+    with _schema_lock:
+        _column_types_cache[table_name] = (time.monotonic(), column_types)
+    return dict(column_types)
+
+
+async def get_table_columns_async(table_name: str) -> Set[str]:
+    return set((await get_table_column_types_async(table_name)).keys())
+
+
+EMPLOYEE_LOOKUP_QUERY = text("""
+    SELECT * FROM employee_master 
+    WHERE person_no = :person_no AND personnel_area = :personnel_area
+    ORDER BY month_year DESC
+    LIMIT 1
+""")
+
+
+def get_employee_from_master(person_no: str, personnel_area: str, session=None) -> Optional[Dict]:
+    """Get employee details from employee_master table"""
+    with session_scope(session) as session:
+        try:
+            result = session.execute(EMPLOYEE_LOOKUP_QUERY, {"person_no": person_no, "personnel_area": personnel_area})
+            row = result.fetchone()
+            if row:
+                return dict(row._mapping)
+            return None
+        except Exception:
+            return None
+
+
+async def get_employee_from_master_async(person_no: str, personnel_area: str, session=None) -> Optional[Dict]:
+    """Async get_employee_from_master for read endpoints"""
+    if not _async_reads_enabled(session):
+        return await asyncio.to_thread(get_employee_from_master, person_no, personnel_area)
+    async with async_session_scope(session) as session:
+        try:
+            result = await session.execute(EMPLOYEE_LOOKUP_QUERY, {"person_no": person_no, "personnel_area": personnel_area})
+            row = result.mappings().first()
+            return dict(row) if row else None
+        except Exception:
+            return None
+
+
+# Totals come from one pass over the primary key (person_no, personnel_area, month_year),
+# grouped on its prefix; the sample reads the tail of idx_month_year.
+EMPLOYEE_STATS_QUERY = text("""
+    SELECT COALESCE(SUM(cnt), 0) AS total_employees,
+           COUNT(*) AS unique_employees,
+           COALESCE(SUM(cnt > 1), 0) AS duplicates_found
+    FROM (
+        SELECT COUNT(*) AS cnt
+        FROM employee_master
+        GROUP BY person_no, personnel_area
+    ) per_employee
+""")
+EMPLOYEE_SAMPLE_QUERY = text("""
+    SELECT * FROM employee_master 
+    ORDER BY month_year DESC 
+    LIMIT 5
+""")
+
+# Seconds the stats stay cached without a master write (0 = until invalidated)
+EMPLOYEE_STATS_TTL = float(os.getenv("EMPLOYEE_STATS_TTL", "3600"))
+_employee_stats_cache = None
+_employee_stats_generation = 0
+
+
+def invalidate_employee_stats():
+    global _employee_stats_cache, _employee_stats_generation
+    _employee_stats_generation += 1
+    _employee_stats_cache = None
+
+
+def _cached_employee_stats() -> Optional[Dict]:
+    cached = _employee_stats_cache
+    if cached and (EMPLOYEE_STATS_TTL <= 0 or time.monotonic() - cached[0] < EMPLOYEE_STATS_TTL):
+        return cached[1]
+    return None
+
+
+def _store_employee_stats(totals, sample, generation: int) -> Dict:
+    """Build the stats result; cache it unless a master write invalidated the stats since generation"""
+    global _employee_stats_cache
+    stats = {key: int(value) for key, value in totals.items()}
+    stats["sample_records"] = [dict(row) for row in sample]
+    if generation == _employee_stats_generation:
+        _employee_stats_cache = (time.monotonic(), stats)
+    return stats
+
+
+def get_employee_master_stats(session=None) -> Dict:
+    """
+    Row count, distinct employees, duplicated keys and the latest records of employee_master.
+    Cached until the next master write (or EMPLOYEE_STATS_TTL).
+    """
+    cached = _cached_employee_stats()
+    if cached is not None:
+        return cached
+    generation = _employee_stats_generation
+    with session_scope(session) as session:
+        totals = session.execute(EMPLOYEE_STATS_QUERY).mappings().one()
+        sample = session.execute(EMPLOYEE_SAMPLE_QUERY).mappings().all()
+    return _store_employee_stats(totals, sample, generation)
+
+
+async def get_employee_master_stats_async(session=None) -> Dict:
+    cached = _cached_employee_stats()
+    if cached is not None:
+        return cached
+    generation = _employee_stats_generation
+    if not _async_reads_enabled(session):
+        return await asyncio.to_thread(get_employee_master_stats)
+    async with async_session_scope(session) as session:
+        totals = (await session.execute(EMPLOYEE_STATS_QUERY)).mappings().one()
+        sample = (await session.execute(EMPLOYEE_SAMPLE_QUERY)).mappings().all()
+    return _store_employee_stats(totals, sample, generation)
+
+
+def get_all_employees_from_master(session=None) -> Dict:
+    """Get ALL employees from employee_master table as a lookup dictionary"""
+    with session_scope(session) as session:
+        try:
+            query = text("SELECT * FROM employee_master ORDER BY month_year")
+            result = session.execute(query)
+            lookup = {}
+            for row in result:
+                row_dict = dict(row._mapping)
+                key = (row_dict.get("person_no"), row_dict.get("personnel_area"))
+                lookup[key] = row_dict
+            return lookup
+        except Exception as e:
+            print(f"Error fetching employees: {e}")
+            return {}
+
+
+def _latest_per_employee(employee_records: List[Dict]) -> List[Dict]:
+    """Keep one record per (person_no, personnel_area), latest month_year wins"""
+    latest: Dict[tuple, Dict] = {}
+    for emp in employee_records:
+        filtered = {k: v for k, v in emp.items() if k in EMPLOYEE_MASTER_FIELDS}
+        if "person_no" not in filtered or "personnel_area" not in filtered:
+            continue
+        key = (filtered["person_no"], filtered["personnel_area"])
+        current = latest.get(key)
+        if current is None or str(filtered.get("month_year") or "") >= str(current.get("month_year") or ""):
+            latest[key] = filtered
+    return list(latest.values())
+
+
+def _fetch_employees(session, keys: List[tuple], fields: List[str]) -> Dict:
+    """Chunked tuple-IN lookup of employee_master; the latest month_year row wins"""
+    select_cols = ", ".join(f"`{f}`" for f in dict.fromkeys(["person_no", "personnel_area", "month_year"] + list(fields)))
+    lookup = {}
+    for start in range(0, len(keys), MASTER_LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + MASTER_LOOKUP_CHUNK_SIZE]
+        params = {}
+        tuples = []
+        for i, (person_no, personnel_area) in enumerate(chunk):
+            params[f"p{i}"] = person_no
+            params[f"a{i}"] = personnel_area
+            tuples.append(f"(:p{i}, :a{i})")
+
+        query = text(f"""
+            SELECT {select_cols} FROM employee_master
+            WHERE (person_no, personnel_area) IN ({", ".join(tuples)})
+            ORDER BY month_year
+        """)
+        for row in session.execute(query, params):
             row_dict = dict(row._mapping)
-            key = (row_dict.get("person_no"), row_dict.get("personnel_area"))
-            lookup[key] = row_dict
-        return lookup
-    except Exception as e:
-        print(f"Error fetching employees: {e}")
+            lookup[(row_dict["person_no"], row_dict["personnel_area"])] = row_dict
+    return lookup
+
+
+def get_employees_from_master(keys, fields: List[str] = None, session=None) -> Dict:
+    """
+    Get employees for the given (person_no, personnel_area) keys as a lookup dictionary.
+    Keys are resolved in chunked tuple-IN queries; the latest month_year row wins.
+    """
+    keys = list(keys)
+    if not keys:
         return {}
-    finally:
-        session.close()
+
+    with session_scope(session) as session:
+        try:
+            return _fetch_employees(session, keys, fields or MASTER_TO_SALARY_FIELDS)
+        except Exception as e:
+            print(f"Error fetching employees: {e}")
+            return {}
 
 
-def batch_upsert_employee_master(employee_records: List[Dict]) -> bool:
+def _employee_key(person_no, personnel_area) -> Tuple[str, str]:
+    return str(person_no), str(personnel_area)
+
+
+def invalidate_employee_cache(keys: Optional[Iterable[tuple]] = None):
+    """Drop cached employee cards for the given (person_no, personnel_area) keys, or all of them"""
+    global _employee_cache_generation
+    with _employee_cache_lock:
+        _employee_cache_generation += 1
+        if keys is None:
+            _employee_cache_stats["invalidations"] += len(_employee_cache)
+            _employee_cache.clear()
+            return
+        for person_no, personnel_area in keys:
+            if _employee_cache.pop(_employee_key(person_no, personnel_area), None) is not None:
+                _employee_cache_stats["invalidations"] += 1
+
+
+def employee_cache_stats() -> Dict:
+    with _employee_cache_lock:
+        stats = dict(_employee_cache_stats)
+        stats["size"] = len(_employee_cache)
+    lookups = stats["hits"] + stats["misses"]
+    stats["max_size"] = EMPLOYEE_CACHE_SIZE
+    stats["ttl_seconds"] = EMPLOYEE_CACHE_TTL
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def lookup_employees(keys: Iterable[tuple], session=None) -> Dict[Tuple[str, str], Optional[Dict]]:
+    """
+    Employee cards for many (person_no, personnel_area) keys, None for unknown keys.
+    Served from the LRU cache where fresh; the misses are fetched together in
+    chunked tuple-IN queries. Unknown keys are cached too, until the next upsert
+    of that key or the TTL.
+    """
+    keys = list(dict.fromkeys(_employee_key(p, a) for p, a in keys))
+    found: Dict[Tuple[str, str], Optional[Dict]] = {}
+    missing = []
+    now = time.monotonic()
+    with _employee_cache_lock:
+        generation = _employee_cache_generation
+        for key in keys:
+            entry = _employee_cache.get(key)
+            if entry and (EMPLOYEE_CACHE_TTL <= 0 or now - entry[0] < EMPLOYEE_CACHE_TTL):
+                _employee_cache.move_to_end(key)
+                found[key] = entry[1]
+            else:
+                missing.append(key)
+        _employee_cache_stats["hits"] += len(found)
+        _employee_cache_stats["misses"] += len(missing)
+
+    if missing:
+        # Errors propagate here: an empty result must not be cached as "unknown"
+        with session_scope(session) as session:
+            fetched = _fetch_employees(session, missing, EMPLOYEE_MASTER_FIELDS)
+        fetched = {_employee_key(*k): v for k, v in fetched.items()}
+        loaded_at = time.monotonic()
+        with _employee_cache_lock:
+            # An upsert committed and invalidated while we were reading: the rows
+            # read may predate it, so they are returned but not cached
+            cacheable = generation == _employee_cache_generation
+            for key in missing:
+                found[key] = fetched.get(key)
+                if cacheable:
+                    _employee_cache[key] = (loaded_at, found[key])
+                    _employee_cache.move_to_end(key)
+            while len(_employee_cache) > EMPLOYEE_CACHE_SIZE:
+                _employee_cache.popitem(last=False)
+                _employee_cache_stats["evictions"] += 1
+
+    return {key: found[key] for key in keys}
+
+
+def batch_upsert_employee_master(employee_records: List[Dict], session=None) -> bool:
     """Batch insert/update employees in employee_master table"""
     if not employee_records:
         return True
     
-    session = SessionLocal()
-    try:
-        master_fields = [
-            "person_no", "employee_name", "designation", "month_year",
-            "for_period", "personnel_area", "personnel_subarea", 
-            "employee_group", "employee_subgroup", "pay_scale_type", 
-            "pay_scale_area", "pay_scale_group", "pay_scale_level", 
-            "bank_account_number", "ifsc_code", "pf_number", "aadhar_no", 
-            "pan_no", "profit_center", "cost_center", "basic_pay", 
-            "basic_pay_adjustment"
-        ]
-        
-        for emp in employee_records:
-            filtered = {k: v for k, v in emp.items() if k in master_fields}
-            if "person_no" not in filtered or "personnel_area" not in filtered:
-                continue
-            
-            # Check if employee exists
-            check_query = text("""
-                SELECT COUNT(*) as cnt FROM employee_master 
-                WHERE person_no = :person_no AND personnel_area = :personnel_area
-            """)
-            exists = session.execute(check_query, {
-                "person_no": filtered["person_no"],
-                "personnel_area": filtered["personnel_area"]
-            }).scalar()
-            
-            if exists:
-                # Update existing
-                set_clause = ", ".join([f"{k} = :{k}" for k in filtered.keys() if k not in ["person_no", "personnel_area"]])
-                if set_clause:
-                    update_query = text(f"""
-                        UPDATE employee_master SET {set_clause}
-                        WHERE person_no = :person_no AND personnel_area = :personnel_area
-                    """)
-                    session.execute(update_query, filtered)
-            else:
-                # Insert new
-                columns = ", ".join(filtered.keys())
-                placeholders = ", ".join([f":{k}" for k in filtered.keys()])
-                insert_query = text(f"""
-                    INSERT INTO employee_master ({columns}) VALUES ({placeholders})
-                """)
-                session.execute(insert_query, filtered)
-        
-        session.commit()
+    latest_records = _latest_per_employee(employee_records)
+    if not latest_records:
         return True
-    except Exception as e:
-        session.rollback()
-        print(f"Error batch upserting employee_master: {e}")
-        return False
-    finally:
-        session.close()
+    
+    with session_scope(session) as session:
+        try:
+            bulk_upsert(session, "employee_master", latest_records, SALARY_KEY_COLUMNS)
+            if not EMPLOYEE_MASTER_HISTORY:
+                prune_master_history(session, [(r["person_no"], r["personnel_area"]) for r in latest_records])
+            if EMPLOYEE_CURRENT_ENABLED:
+                sync_employee_current(session, [(r["person_no"], r["personnel_area"]) for r in latest_records])
+            session.commit()
+            invalidate_employee_cache((r["person_no"], r["personnel_area"]) for r in latest_records)
+            invalidate_employee_stats()
+            return True
+        except Exception as e:
+            session.rollback()
+            print(f"Error batch upserting employee_master: {e}")
+            return False
 
 
-def enrich_salary_records_with_master(records: List[Dict]) -> List[Dict]:
+def enrich_salary_records_with_master(records: List[Dict], session=None) -> List[Dict]:
     """Enrich salary records with employee_master data - OPTIMIZED VERSION"""
     if not records:
         return []
     
     # STEP 1: Batch upsert all employees to master
-    batch_upsert_employee_master(records)
+    batch_upsert_employee_master(records, session)
     
-    # STEP 2: Get ALL employees from master in one call
-    employee_lookup = get_all_employees_from_master()
+    # STEP 2: Fetch only the employees present in this batch
+    keys = {
+        (record.get("person_no"), record.get("personnel_area"))
+        for record in records
+        if record.get("person_no") and record.get("personnel_area")
+    }
+    employee_lookup = get_employees_from_master(keys, session=session)
     
     # STEP 3: Enrich records using in-memory lookup
     enriched_records = []
@@ -158,16 +531,7 @@ def enrich_salary_records_with_master(records: List[Dict]) -> List[Dict]:
         if employee_data:
             enriched = record.copy()
             
-            master_to_salary_fields = [
-                "employee_name", "designation", "for_period", 
-                "personnel_subarea", "employee_group", "employee_subgroup", 
-                "pay_scale_type", "pay_scale_area", "pay_scale_group", 
-                "pay_scale_level", "bank_account_number", "ifsc_code", 
-                "pf_number", "aadhar_no", "pan_no", "profit_center", 
-                "cost_center", "basic_pay", "basic_pay_adjustment"
-            ]
-            
-            for field in master_to_salary_fields:
+            for field in MASTER_TO_SALARY_FIELDS:
                 if field in employee_data:
                     if field not in enriched or enriched[field] is None:
                         enriched[field] = employee_data[field]
@@ -179,118 +543,757 @@ def enrich_salary_records_with_master(records: List[Dict]) -> List[Dict]:
     return enriched_records
 
 
-def create_salary_table(table_name: str, column_definitions: Dict[str, str]):
+def _in_clause(prefix: str, keys: List[tuple], params: Dict) -> str:
+    """Bind a list of key tuples as "(:p0_0, :p0_1), ..." for a tuple-IN predicate"""
+    tuples = []
+    for i, key in enumerate(keys):
+        names = []
+        for j, value in enumerate(key):
+            params[f"{prefix}{i}_{j}"] = value
+            names.append(f":{prefix}{i}_{j}")
+        tuples.append(f"({', '.join(names)})")
+    return ", ".join(tuples)
+
+
+def prune_master_history(session, keys: List[tuple]) -> int:
+    """
+    Delete every employee_master row of the given (person_no, personnel_area) keys
+    except the latest month's, leaving one row per employee. The caller commits.
+    """
+    deleted = 0
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), MASTER_LOOKUP_CHUNK_SIZE):
+        params: Dict = {}
+        in_sql = _in_clause("k", keys[start:start + MASTER_LOOKUP_CHUNK_SIZE], params)
+        deleted += session.execute(text(f"""
+            DELETE m FROM employee_master m
+            JOIN (
+                SELECT person_no, personnel_area, MAX(month_year) AS latest
+                FROM employee_master
+                WHERE (person_no, personnel_area) IN ({in_sql})
+                GROUP BY person_no, personnel_area
+            ) l ON l.person_no = m.person_no AND l.personnel_area = m.personnel_area
+            WHERE m.month_year < l.latest
+        """), params).rowcount
+    return deleted
+
+
+def ensure_employee_current_table(session):
+    """Create employee_current (employee_master's columns, keyed per employee) if missing"""
+    if table_exists(EMPLOYEE_CURRENT_TABLE):
+        return
+    session.execute(text(f"CREATE TABLE IF NOT EXISTS `{EMPLOYEE_CURRENT_TABLE}` LIKE employee_master"))
+    session.execute(text(f"""
+        ALTER TABLE `{EMPLOYEE_CURRENT_TABLE}`
+        DROP PRIMARY KEY, ADD PRIMARY KEY (`person_no`, `personnel_area`)
+    """))
+    invalidate_schema_cache(EMPLOYEE_CURRENT_TABLE)
+
+
+def sync_employee_current(session, keys: Optional[List[tuple]] = None) -> int:
+    """
+    Copy the latest master row of each (person_no, personnel_area) into employee_current.
+    Only the given keys are refreshed; keys=None rebuilds every employee.
+    The caller commits.
+    """
+    ensure_employee_current_table(session)
+    columns = [c for c in get_table_column_types("employee_master") if c not in ("created_at", "updated_at")]
+    column_sql = ", ".join(f"`{c}`" for c in columns)
+    select_sql = ", ".join(f"m.`{c}`" for c in columns)
+    update_sql = ", ".join(f"`{c}` = VALUES(`{c}`)" for c in columns if c not in ("person_no", "personnel_area"))
+
+    def upsert(where_sql: str, params: Dict) -> int:
+        query = text(f"""
+            INSERT INTO `{EMPLOYEE_CURRENT_TABLE}` ({column_sql})
+            SELECT {select_sql} FROM employee_master m
+            JOIN (
+                SELECT person_no, personnel_area, MAX(month_year) AS latest
+                FROM employee_master {where_sql}
+                GROUP BY person_no, personnel_area
+            ) l ON l.person_no = m.person_no AND l.personnel_area = m.personnel_area
+               AND l.latest = m.month_year
+            ON DUPLICATE KEY UPDATE {update_sql}
+        """)
+        return session.execute(query, params).rowcount
+
+    if keys is None:
+        return upsert("", {})
+    written = 0
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), MASTER_LOOKUP_CHUNK_SIZE):
+        params: Dict = {}
+        in_sql = _in_clause("k", keys[start:start + MASTER_LOOKUP_CHUNK_SIZE], params)
+        written += upsert(f"WHERE (person_no, personnel_area) IN ({in_sql})", params)
+    return written
+
+
+def cleanup_employee_master(dry_run: bool = False, batch_size: Optional[int] = None,
+                            sync_current: bool = False, session=None) -> Dict:
+    """
+    Delete every master row older than its employee's latest month_year.
+    Stale primary keys are found in one ROW_NUMBER() pass, then deleted in
+    batches of batch_size rows, each in its own short transaction, so the
+    table is never locked by one large DELETE. dry_run only reports counts.
+    sync_current first refreshes employee_current from the full master.
+    """
+    batch_size = batch_size or MASTER_CLEANUP_BATCH_SIZE
+    with session_scope(session) as session:
+        stale = [tuple(row) for row in session.execute(text("""
+            SELECT person_no, personnel_area, month_year FROM (
+                SELECT person_no, personnel_area, month_year,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY person_no, personnel_area ORDER BY month_year DESC
+                       ) AS rn
+                FROM employee_master
+            ) ranked
+            WHERE rn > 1
+        """))]
+        result = {
+            "dry_run": dry_run,
+            "duplicates_found": len(stale),
+            "employees_affected": len({(p, a) for p, a, _ in stale}),
+            "duplicates_removed": 0,
+            "batches": 0,
+        }
+        # Nothing above touched rows, so end the read before the write batches
+        session.rollback()
+
+        if not dry_run:
+            if sync_current:
+                try:
+                    result["current_rows_synced"] = sync_employee_current(session)
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    raise Exception(f"Failed to sync {EMPLOYEE_CURRENT_TABLE}: {str(e)}")
+
+            for start in range(0, len(stale), batch_size):
+                params: Dict = {}
+                in_sql = _in_clause("k", stale[start:start + batch_size], params)
+                try:
+                    deleted = session.execute(text(f"""
+                        DELETE FROM employee_master
+                        WHERE (person_no, personnel_area, month_year) IN ({in_sql})
+                    """), params).rowcount
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    raise Exception(f"Cleanup stopped after {result['duplicates_removed']} rows: {str(e)}")
+                result["duplicates_removed"] += deleted
+                result["batches"] += 1
+
+            if result["duplicates_removed"]:
+                invalidate_employee_cache()
+                invalidate_employee_stats()
+
+        # Pruning never drops an employee, so this holds for dry runs too
+        result["unique_employees_remaining"] = get_employee_master_stats(session)["unique_employees"]
+    return result
+
+
+def _index_name(columns: List[str]) -> str:
+    return "idx_" + "_".join(columns)[:60]
+
+
+def _indexable(col_type: str) -> bool:
+    return not any(t in col_type.upper() for t in ("TEXT", "BLOB", "JSON"))
+
+
+def _salary_index_sql(column_types: Dict[str, str]) -> List[str]:
+    """KEY clauses for the configured SALARY_TABLE_INDEXES that fit this table's columns"""
+    clauses = []
+    for columns in SALARY_TABLE_INDEXES:
+        if columns == SALARY_KEY_COLUMNS[:len(columns)]:
+            continue  # already a prefix of the primary key
+        if all(c in column_types and _indexable(column_types[c]) for c in columns):
+            clauses.append(f"KEY `{_index_name(columns)}` ({', '.join(f'`{c}`' for c in columns)})")
+    return clauses
+
+
+def _month_partition_sql(year: int) -> str:
+    """RANGE COLUMNS(month_year) partitions, one per month of the year plus a catch-all"""
+    partitions = [
+        f"PARTITION p{month:02d} VALUES LESS THAN ('{year + month // 12}-{month % 12 + 1:02d}-01')"
+        for month in range(1, 13)
+    ]
+    partitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return "PARTITION BY RANGE COLUMNS(`month_year`) (\n    " + ",\n    ".join(partitions) + "\n)"
+
+
+def create_salary_table(table_name: str, column_definitions: Dict[str, str], session=None,
+                        year: Optional[int] = None):
     """
     Create a new salary register table for a specific year
     column_definitions: dict of {column_name: sql_type}
+    Adds the configured secondary indexes and, with SALARY_TABLE_PARTITIONING=month
+    and a year, one RANGE partition per month.
     """
-    session = SessionLocal()
-    try:
-        cols = []
-        for col_name, col_type in column_definitions.items():
-            # Convert to MySQL types
-            # If infer_sql_type already returned a full SQL type, keep it
-            if "(" in col_type or col_type.upper() in {"DATE", "INT", "BIGINT"}:
-                final_type = col_type
-            elif col_type == "numeric":
-                final_type = "DECIMAL(15,2)"
-            elif col_type == "bigint":
-                final_type = "BIGINT"
-            elif col_type == "date":
-                final_type = "DATE"
-            else:
-                final_type = "TEXT"
-
-            
-            null_constraint = "NOT NULL" if col_name in ["person_no", "personnel_area", "month_year"] else "NULL"
-            cols.append(f"`{col_name}` {col_type} {null_constraint}")
+    with session_scope(session) as session:
+        try:
+            cols = []
+            for col_name, col_type in column_definitions.items():
+                null_constraint = "NOT NULL" if col_name in SALARY_KEY_COLUMNS else "NULL"
+                cols.append(f"`{col_name}` {_sql_type(col_type)} {null_constraint}")
+            cols.append("created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+            cols.append("PRIMARY KEY (`person_no`, `personnel_area`, `month_year`)")
+            cols.extend(_salary_index_sql({c: _sql_type(t) for c, t in column_definitions.items()}))
         
-        columns_sql = ",\n    ".join(cols)
+            columns_sql = ",\n    ".join(cols)
+            partition_sql = _month_partition_sql(year) if SALARY_TABLE_PARTITIONING == "month" and year else ""
         
-        create_table_sql = f"""
-        CREATE TABLE `{table_name}` (
-            {columns_sql},
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (`person_no`, `personnel_area`, `month_year`)
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-        """
+            # IF NOT EXISTS: another process may have created the table since we checked
+            create_table_sql = f"""
+            CREATE TABLE IF NOT EXISTS `{table_name}` (
+                {columns_sql}
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            {partition_sql};
+            """
         
-        session.execute(text(create_table_sql))
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        raise Exception(f"Failed to create table {table_name}: {str(e)}")
-    finally:
-        session.close()
+            session.execute(text(create_table_sql))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise Exception(f"Failed to create table {table_name}: {str(e)}")
+        finally:
+            invalidate_schema_cache(table_name)
 
 
-def add_column(table_name: str, col_name: str, col_type: str):
-    """Add a new column to an existing table"""
-    session = SessionLocal()
-    try:
-        # Convert to MySQL types
-        if col_type == "numeric":
-            col_type = "DECIMAL(15,2)"
-        elif col_type == "bigint":
-            col_type = "BIGINT"
-        elif col_type == "date":
-            col_type = "DATE"
+def ensure_salary_indexes(table_name: str, session=None) -> List[str]:
+    """Add any configured secondary index an existing year table is missing; returns their names"""
+    column_types = get_table_column_types(table_name)
+    with session_scope(session) as session:
+        existing = {
+            row[0] for row in session.execute(text("""
+                SELECT DISTINCT index_name FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = :table_name
+            """), {"table_name": table_name})
+        }
+        missing = [clause for clause in _salary_index_sql(column_types) if clause.split("`")[1] not in existing]
+        if not missing:
+            return []
+        try:
+            session.execute(text(f"ALTER TABLE `{table_name}` " + ", ".join(f"ADD {clause}" for clause in missing)))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise Exception(f"Failed to add indexes to {table_name}: {str(e)}")
+        return [clause.split("`")[1] for clause in missing]
+
+
+def _sql_type(col_type: str) -> str:
+    """Map legacy type names (numeric/bigint/date) to MySQL; full SQL types pass through"""
+    legacy = {"numeric": "DECIMAL(15,2)", "bigint": "BIGINT", "date": "DATE", "text": "TEXT"}
+    if col_type in legacy:
+        return legacy[col_type]
+    if re.fullmatch(r"[A-Za-z]+(\s*\(\s*\d+(\s*,\s*\d+)?\s*\))?", col_type.strip()):
+        return col_type.strip()
+    return "TEXT"
+
+
+def alter_salary_table(table_name: str, add_columns: Optional[Dict[str, str]] = None,
+                       modify_columns: Optional[Dict[str, str]] = None, session=None):
+    """
+    Apply all schema changes for a table in one ALTER TABLE: new columns and
+    columns whose type must change (e.g. a VARCHAR that new data outgrew).
+    Pure column additions are tried with ALGORITHM=INSTANT first (MySQL 8.0.12+,
+    MariaDB 10.3+), falling back to the server's default algorithm.
+    """
+    add_columns = add_columns or {}
+    modify_columns = modify_columns or {}
+    if not add_columns and not modify_columns:
+        return
+    clauses = [f"ADD COLUMN `{col}` {_sql_type(col_type)} NULL" for col, col_type in add_columns.items()]
+    clauses += [f"MODIFY COLUMN `{col}` {_sql_type(col_type)} NULL" for col, col_type in modify_columns.items()]
+    alter_sql = f"ALTER TABLE `{table_name}` {', '.join(clauses)}"
+
+    caller_session = session
+    with session_scope(session) as session:
+        try:
+            if SCHEMA_ALTER_INSTANT and not modify_columns:
+                try:
+                    session.execute(text(f"{alter_sql}, ALGORITHM=INSTANT"))
+                    session.commit()
+                    return
+                except Exception as e:
+                    session.rollback()
+                    if "Duplicate column name" in str(e):
+                        raise
+                    print(f"ALGORITHM=INSTANT not available for {table_name}, retrying: {e}")
+            session.execute(text(alter_sql))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if "Duplicate column name" not in str(e):
+                raise Exception(f"Failed to alter table {table_name}: {str(e)}")
+            duplicate = True
         else:
-            col_type = "TEXT"
-        
-        alter_sql = f"ALTER TABLE `{table_name}` ADD COLUMN `{col_name}` {col_type} NULL"
-        session.execute(text(alter_sql))
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        raise Exception(f"Failed to add column {col_name} to {table_name}: {str(e)}")
-    finally:
-        session.close()
+            duplicate = False
+        finally:
+            invalidate_schema_cache(table_name)
+
+    if duplicate:
+        # Another process added some of these columns first: the failed ALTER changed
+        # nothing, so retry with only the columns that are still missing
+        existing = get_table_column_types(table_name)
+        alter_salary_table(
+            table_name,
+            add_columns={col: t for col, t in add_columns.items() if col not in existing},
+            modify_columns=modify_columns,
+            session=caller_session
+        )
+
+
+def widen_columns(table_name: str, column_types: Dict[str, str], session=None):
+    """Change the types of existing columns in one ALTER TABLE"""
+    alter_salary_table(table_name, modify_columns=column_types, session=session)
+
+
+def add_column(table_name: str, col_name: str, col_type: str, session=None):
+    """Add a new column to an existing table"""
+    alter_salary_table(table_name, add_columns={col_name: col_type}, session=session)
+
 
+def _int_columns(column_types: Dict[str, str]) -> Set[str]:
+    """Columns whose SQL type is an integer type (INT, BIGINT, ...)"""
+    return {col for col, col_type in column_types.items() if "INT" in str(col_type).upper()}
 
-def insert_salary_register(table_name: str, records: List[Dict]):
-    """Insert records into the specified salary register table using REPLACE INTO"""
+
+def _coerce_int_columns(records: List[Dict], int_columns: Set[str]) -> None:
+    """
+    Coerce integer columns in place, one column at a time. Values that are not
+    whole numbers raise rather than being truncated or written as NULL.
+    """
+    if not records:
+        return
+    present = set().union(*(record.keys() for record in records)) & int_columns
+    for col in present:
+        for record in records:
+            value = record.get(col)
+            if value is None or value == "":
+                record[col] = None
+                continue
+            try:
+                number = Decimal(str(value).strip())
+            except InvalidOperation:
+                number = None
+            if number is None or not number.is_finite() or number != number.to_integral_value():
+                raise ValueError(f"Column {col} is an integer column but got {value!r}")
+            record[col] = int(number)
+
+
+def bulk_upsert(session, table_name: str, records: List[Dict], key_columns: List[str],
+                chunk_size: int = None, null_missing: Optional[List[str]] = None) -> int:
+    """
+    Write records with multi-row INSERT ... ON DUPLICATE KEY UPDATE batches.
+    Records are grouped by column signature so every group compiles to one
+    statement, which is then sent with executemany in chunks of chunk_size.
+    null_missing: columns set to NULL on updated rows whose record does not carry
+    them, so an update replaces the whole row as REPLACE INTO did.
+    """
+    if not records:
+        return 0
+
+    chunk_size = chunk_size or SALARY_INSERT_CHUNK_SIZE
+
+    groups: Dict[tuple, List[Dict]] = {}
+    for record in records:
+        groups.setdefault(tuple(record.keys()), []).append(record)
+
+    written = 0
+    for columns, rows in groups.items():
+        column_sql = ", ".join([f"`{c}`" for c in columns])
+        placeholders = ", ".join([f":{c}" for c in columns])
+        update_cols = [c for c in columns if c not in key_columns] or [columns[0]]
+        update_sql = ", ".join(
+            [f"`{c}` = VALUES(`{c}`)" for c in update_cols]
+            + [f"`{c}` = NULL" for c in (null_missing or []) if c not in columns and c not in key_columns]
+        )
+
+        upsert_query = text(f"""
+            INSERT INTO `{table_name}` ({column_sql}) VALUES ({placeholders})
+            ON DUPLICATE KEY UPDATE {update_sql}
+        """)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            session.execute(upsert_query, chunk)
+            written += len(chunk)
+
+    return written
+
+
+def insert_salary_register(table_name: str, records: List[Dict], chunk_size: int = None, session=None,
+                           enrich: bool = True):
+    """
+    Upsert records into the specified salary register table in multi-row batches.
+    enrich=False skips the employee_master sync for callers that already enriched the records.
+    """
     if not records:
         return None
     
-    enriched_records = enrich_salary_records_with_master(records)
+    enriched_records = enrich_salary_records_with_master(records, session) if enrich else list(records)
     column_types = get_table_column_types(table_name)
+    _coerce_int_columns(enriched_records, _int_columns(column_types))
+    
+    touched = {
+        (record.get("month_year"), record.get("personnel_area"))
+        for record in enriched_records
+        if record.get("month_year") and record.get("personnel_area")
+    }
     
-    session = SessionLocal()
+    with session_scope(session) as session:
+        try:
+            # A re-sent row replaces the stored one: pay heads it no longer has become NULL
+            null_missing = [c for c in column_types if c != "created_at"]
+            bulk_upsert(session, table_name, enriched_records, SALARY_KEY_COLUMNS, chunk_size, null_missing)
+            refresh_monthly_summary(session, table_name, touched)
+            session.commit()
+            return {"status": "success", "rows_inserted": len(enriched_records)}
+        except Exception as e:
+            session.rollback()
+            raise Exception(f"Failed to insert records: {str(e)}")
+
+
+def _keyset_after_clause(after: Optional[tuple], params: Dict) -> str:
+    """WHERE fragment selecting rows after the given (person_no, personnel_area, month_year) key"""
+    if not after:
+        return ""
+    params["after_p"], params["after_a"], params["after_m"] = after
+    return """
+        (person_no > :after_p OR (person_no = :after_p AND
+            (personnel_area > :after_a OR (personnel_area = :after_a AND month_year > :after_m))))
+    """
+
+
+def _parse_month_bound(value: str, end: bool) -> tuple:
+    """
+    Parse a month_year bound given as YYYY-MM or YYYY-MM-DD.
+    Returns (operator, date); a YYYY-MM upper bound covers the whole month.
+    """
     try:
-        for record in enriched_records:
-            cleaned_record = {}
-            for col, value in record.items():
-                if value is None:
-                    cleaned_record[col] = None
-                elif col in column_types:
-                    col_type = str(column_types[col]).upper()
-                    if "BIGINT" in col_type or "INT" in col_type:
-                        try:
-                            cleaned_record[col] = int(value) if value else None
-                        except (ValueError, TypeError):
-                            cleaned_record[col] = None
-                    else:
-                        cleaned_record[col] = value
-                else:
-                    cleaned_record[col] = value
-            
-            # Use REPLACE INTO for upsert behavior
-            columns = ", ".join([f"`{k}`" for k in cleaned_record.keys()])
-            placeholders = ", ".join([f":{k}" for k in cleaned_record.keys()])
-            
-            replace_query = text(f"""
-                REPLACE INTO `{table_name}` ({columns}) VALUES ({placeholders})
-            """)
-            session.execute(replace_query, cleaned_record)
-        
-        session.commit()
-        return {"status": "success", "rows_inserted": len(enriched_records)}
-    except Exception as e:
-        session.rollback()
-        raise Exception(f"Failed to insert records: {str(e)}")
-    finally:
-        session.close()
+        if len(value) == 7:
+            first = datetime.strptime(value, "%Y-%m").date()
+            if not end:
+                return ">=", first
+            next_month = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+            return "<", next_month
+        return ("<=" if end else ">="), datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Invalid month bound: {value}")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _parse_order_by(order_by: Optional[str], columns: Set[str]) -> str:
+    """Compile 'col,-col2' into an ORDER BY clause, validated against the table columns"""
+    if not order_by:
+        return ", ".join(SALARY_KEY_COLUMNS)
+    parts = []
+    ordered_cols = set()
+    for item in order_by.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        direction = "DESC" if item.startswith("-") else "ASC"
+        col = item.lstrip("-+")
+        if col not in columns:
+            raise ValueError(f"Unknown order_by column: {col}")
+        parts.append(f"`{col}` {direction}")
+        ordered_cols.add(col)
+    # Primary key as tie-breaker keeps the order deterministic
+    parts.extend([f"`{c}` ASC" for c in SALARY_KEY_COLUMNS if c not in ordered_cols])
+    return ", ".join(parts)
+
+
+def build_salary_query(table_name: str, filters: Optional[Dict] = None, fields: Optional[List[str]] = None,
+                       order_by: Optional[str] = None, after: Optional[tuple] = None,
+                       limit: Optional[int] = None):
+    """
+    Compile a parameterized SELECT over a salary register table.
+    filters: personnel_area (list), month_from, month_to, person_no (prefix), name (prefix)
+    fields: projection, validated against the cached column list
+    Raises ValueError for unknown columns or malformed filters.
+    """
+    columns = get_table_columns(table_name)
+    filters = filters or {}
+    params: Dict = {}
+    conditions = []
+
+    if fields:
+        unknown = [f for f in fields if f not in columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+        select_cols = list(dict.fromkeys(fields))
+        if after is not None or limit is not None:
+            select_cols += [c for c in SALARY_KEY_COLUMNS if c not in select_cols]
+        select_sql = ", ".join([f"`{c}`" for c in select_cols])
+    else:
+        select_sql = "*"
+
+    areas = filters.get("personnel_area")
+    if areas:
+        placeholders = []
+        for i, area in enumerate(areas):
+            params[f"area{i}"] = area
+            placeholders.append(f":area{i}")
+        conditions.append(f"personnel_area IN ({', '.join(placeholders)})")
+
+    if filters.get("month_from"):
+        op, params["month_from"] = _parse_month_bound(filters["month_from"], end=False)
+        conditions.append(f"month_year {op} :month_from")
+
+    if filters.get("month_to"):
+        op, params["month_to"] = _parse_month_bound(filters["month_to"], end=True)
+        conditions.append(f"month_year {op} :month_to")
+
+    if filters.get("person_no"):
+        params["person_no_prefix"] = _escape_like(filters["person_no"]) + "%"
+        conditions.append("person_no LIKE :person_no_prefix")
+
+    if filters.get("name"):
+        if "employee_name" not in columns:
+            raise ValueError("Table has no employee_name column")
+        params["name_prefix"] = _escape_like(filters["name"]) + "%"
+        conditions.append("employee_name LIKE :name_prefix")
+
+    keyset = _keyset_after_clause(after, params)
+    if keyset:
+        conditions.append(keyset)
+
+    sql = f"SELECT {select_sql} FROM `{table_name}`"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {_parse_order_by(order_by, columns)}"
+    if limit is not None:
+        params["limit"] = limit
+        sql += " LIMIT :limit"
+
+    return text(sql), params
+
+
+def get_salary_page(table_name: str, limit: Optional[int] = None, after: Optional[tuple] = None,
+                    filters: Optional[Dict] = None, fields: Optional[List[str]] = None,
+                    order_by: Optional[str] = None, session=None) -> List[Dict]:
+    """Get matching rows of a salary register table, optionally one keyset page after the given key"""
+    query, params = build_salary_query(table_name, filters, fields, order_by, after, limit)
+    with session_scope(session) as session:
+        return [dict(row) for row in session.execute(query, params).mappings()]
+
+
+async def get_salary_page_async(table_name: str, limit: Optional[int] = None, after: Optional[tuple] = None,
+                                filters: Optional[Dict] = None, fields: Optional[List[str]] = None,
+                                order_by: Optional[str] = None, session=None) -> List[Dict]:
+    """Async get_salary_page; warms the column cache so query building does not block"""
+    if not _async_reads_enabled(session):
+        return await asyncio.to_thread(get_salary_page, table_name, limit, after, filters, fields, order_by)
+    await get_table_column_types_async(table_name)
+    query, params = build_salary_query(table_name, filters, fields, order_by, after, limit)
+    async with async_session_scope(session) as session:
+        result = await session.execute(query, params)
+        return [dict(row) for row in result.mappings()]
+
+
+def stream_salary_rows(table_name: str, filters: Optional[Dict] = None, fields: Optional[List[str]] = None,
+                       order_by: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict]:
+    """
+    Iterate matching rows of a salary register table through a server-side cursor.
+    The query is compiled eagerly so invalid filters raise before streaming starts.
+    """
+    query, params = build_salary_query(table_name, filters, fields, order_by)
+
+    def rows():
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query, params)
+            for row in result.mappings():
+                yield dict(row)
+
+    return rows()
+
+
+def _numeric_columns(column_types: Dict[str, str]) -> List[str]:
+    """Summable pay columns (DECIMAL / INT / FLOAT / DOUBLE), excluding the year partition column"""
+    numeric_markers = ("DECIMAL", "NUMERIC", "INT", "FLOAT", "DOUBLE")
+    return [
+        col for col, col_type in column_types.items()
+        if col != "year" and any(marker in str(col_type).upper() for marker in numeric_markers)
+    ]
+
+
+def summary_measures(columns: List[str]) -> List[str]:
+    """The numeric columns that get a salary_monthly_summary measure"""
+    if SUMMARY_MEASURES:
+        return [c for c in columns if c in SUMMARY_MEASURES]
+    return [c for c in columns if c not in SUMMARY_EXCLUDED and not SUMMARY_IDENTIFIER_PATTERN.search(c)]
+
+
+def get_fiscal_year_totals(fy_start: int, fields: Optional[List[str]] = None,
+                           personnel_area: Optional[List[str]] = None, session=None) -> Optional[Dict]:
+    """
+    Per-employee totals for the Indian fiscal year fy_start-04 .. (fy_start+1)-03.
+    The FY spans two calendar-year tables; both are read in one UNION ALL with the
+    month range pushed into each branch. Columns missing from one table read as NULL.
+    Returns None when neither table exists.
+    """
+    branches = [
+        (f"salaryregister{fy_start}", "month_year >= :fy_from"),
+        (f"salaryregister{fy_start + 1}", "month_year < :fy_to"),
+    ]
+    branches = [(t, cond) for t, cond in branches if table_exists(t)]
+    if not branches:
+        return None
+
+    table_types = {t: get_table_column_types(t) for t, _ in branches}
+    numeric = list(dict.fromkeys(c for t, _ in branches for c in _numeric_columns(table_types[t])))
+    if fields:
+        unknown = [f for f in fields if f not in numeric]
+        if unknown:
+            raise ValueError(f"Unknown or non-numeric fields: {unknown}")
+        numeric = list(dict.fromkeys(fields))
+
+    has_name = any("employee_name" in table_types[t] for t, _ in branches)
+    carried = (["employee_name"] if has_name else []) + numeric
+
+    params: Dict = {"fy_from": date(fy_start, 4, 1), "fy_to": date(fy_start + 1, 4, 1)}
+    area_sql = ""
+    if personnel_area:
+        placeholders = []
+        for i, area in enumerate(personnel_area):
+            params[f"area{i}"] = area
+            placeholders.append(f":area{i}")
+        area_sql = f" AND personnel_area IN ({', '.join(placeholders)})"
+
+    branch_sql = []
+    for table, month_cond in branches:
+        cols = ", ".join([f"`{c}`" if c in table_types[table] else f"NULL AS `{c}`" for c in carried])
+        branch_sql.append(f"""
+            SELECT person_no, personnel_area, month_year{", " + cols if cols else ""}
+            FROM `{table}`
+            WHERE {month_cond}{area_sql}
+        """)
+
+    aggregates = ", ".join([f"SUM(`{c}`) AS `{c}`" for c in numeric])
+    query = text(f"""
+        SELECT person_no, personnel_area,
+               {"MAX(employee_name) AS employee_name," if has_name else ""}
+               COUNT(*) AS month_count,
+               MIN(month_year) AS first_month,
+               MAX(month_year) AS last_month{", " + aggregates if aggregates else ""}
+        FROM ({" UNION ALL ".join(branch_sql)}) fy
+        GROUP BY person_no, personnel_area
+        ORDER BY person_no, personnel_area
+    """)
+
+    with session_scope(session) as session:
+        rows = [dict(row) for row in session.execute(query, params).mappings()]
+        return {"tables": [t for t, _ in branches], "fields": numeric, "data": rows}
+
+
+def ensure_summary_table(session):
+    """Create the salary_monthly_summary rollup table if it does not exist yet"""
+    if table_exists(SUMMARY_TABLE):
+        return
+    session.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS `{SUMMARY_TABLE}` (
+            `year` INT NOT NULL,
+            `month_year` DATE NOT NULL,
+            `personnel_area` VARCHAR(100) NOT NULL,
+            `measure` VARCHAR(64) NOT NULL,
+            `total` DECIMAL(20,2) NULL,
+            `row_count` INT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (`year`, `month_year`, `personnel_area`, `measure`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    invalidate_schema_cache(SUMMARY_TABLE)
+
+
+def refresh_monthly_summary(session, table_name: str, touched: Optional[Set[tuple]] = None) -> int:
+    """
+    Recompute salary_monthly_summary for the given (month_year, personnel_area) groups
+    of a salary register table, or for the whole table when touched is None.
+    Each numeric column becomes one measure row per group.
+    """
+    if touched is not None and not touched:
+        return 0
+
+    measures = summary_measures(_numeric_columns(get_table_column_types(table_name)))
+
+    ensure_summary_table(session)
+
+    aggregates = "".join([f", SUM(`{m}`) AS `{m}`" for m in measures])
+    summary_rows = []
+    groups = list(touched) if touched is not None else [None]
+    for start in range(0, len(groups), MASTER_LOOKUP_CHUNK_SIZE):
+        params: Dict = {}
+        where = ""
+        if touched is not None:
+            tuples = []
+            for i, (month_year, area) in enumerate(groups[start:start + MASTER_LOOKUP_CHUNK_SIZE]):
+                params[f"m{i}"] = month_year
+                params[f"a{i}"] = area
+                tuples.append(f"(:m{i}, :a{i})")
+            where = f"WHERE (month_year, personnel_area) IN ({', '.join(tuples)})"
+
+        query = text(f"""
+            SELECT YEAR(month_year) AS year, month_year, personnel_area, COUNT(*) AS row_count{aggregates}
+            FROM `{table_name}`
+            {where}
+            GROUP BY month_year, personnel_area
+        """)
+        for row in session.execute(query, params).mappings():
+            base = {
+                "year": row["year"],
+                "month_year": row["month_year"],
+                "personnel_area": row["personnel_area"],
+                "row_count": row["row_count"],
+            }
+            summary_rows.append({**base, "measure": SUMMARY_ROW_COUNT, "total": row["row_count"]})
+            for m in measures:
+                summary_rows.append({**base, "measure": m, "total": row[m]})
+
+    return bulk_upsert(session, SUMMARY_TABLE, summary_rows, ["year", "month_year", "personnel_area", "measure"])
+
+
+def rebuild_monthly_summary(table_name: str, session=None) -> int:
+    """Recompute the whole summary for one salary register table (backfill)"""
+    with session_scope(session) as session:
+        try:
+            written = refresh_monthly_summary(session, table_name)
+            session.commit()
+            return written
+        except Exception as e:
+            session.rollback()
+            raise Exception(f"Failed to rebuild summary for {table_name}: {str(e)}")
+
+
+def get_monthly_summary(year: Optional[int] = None, personnel_area: Optional[List[str]] = None,
+                        measures: Optional[List[str]] = None, session=None) -> List[Dict]:
+    """Read rollup rows from salary_monthly_summary"""
+    if not table_exists(SUMMARY_TABLE):
+        return []
+
+    params: Dict = {}
+    conditions = []
+    if year is not None:
+        params["year"] = year
+        conditions.append("year = :year")
+    for name, values in (("personnel_area", personnel_area), ("measure", measures)):
+        if values:
+            placeholders = []
+            for i, value in enumerate(values):
+                params[f"{name}{i}"] = value
+                placeholders.append(f":{name}{i}")
+            conditions.append(f"{name} IN ({', '.join(placeholders)})")
+
+    query = text(f"""
+        SELECT year, month_year, personnel_area, measure, total, row_count
+        FROM `{SUMMARY_TABLE}`
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY year, month_year, personnel_area, measure
+    """)
+    with session_scope(session) as session:
+        return [dict(row) for row in session.execute(query, params).mappings()]
 
 
 def get_existing_columns():
@@ -300,14 +1303,44 @@ def get_existing_columns():
 
 __all__ = [
     'table_exists',
+    'table_is_empty',
     'get_table_columns', 
     'get_table_column_types',
+    'table_exists_async',
+    'get_table_columns_async',
+    'get_table_column_types_async',
+    'invalidate_schema_cache',
+    'table_ddl_lock',
     'create_salary_table',
+    'ensure_salary_indexes',
     'add_column',
+    'widen_columns',
+    'alter_salary_table',
     'insert_salary_register',
+    'bulk_upsert',
     'get_existing_columns',
+    'build_salary_query',
+    'get_salary_page',
+    'get_salary_page_async',
+    'stream_salary_rows',
+    'get_fiscal_year_totals',
+    'summary_measures',
+    'refresh_monthly_summary',
+    'rebuild_monthly_summary',
+    'get_monthly_summary',
     'get_employee_from_master',
+    'get_employee_from_master_async',
+    'get_employee_master_stats',
+    'get_employee_master_stats_async',
+    'invalidate_employee_stats',
     'get_all_employees_from_master',
+    'get_employees_from_master',
+    'lookup_employees',
+    'invalidate_employee_cache',
+    'employee_cache_stats',
     'batch_upsert_employee_master',
+    'cleanup_employee_master',
+    'prune_master_history',
+    'sync_employee_current',
     'enrich_salary_records_with_master'
 ]
\ No newline at end of file
@@ -0,0 +1,140 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List
+import csv
+import io
+import os
+import re
+import tempfile
+
+EXPORT_FORMATS = ("csv", "parquet", "xlsx")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Rows per CSV flush / Parquet row group
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+
+# Bytes per chunk when streaming a finished export file
+EXPORT_READ_BYTES = 1 << 20
+
+
+def _batches(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(rows: Iterable[Dict], columns: List[str]) -> Iterator[bytes]:
+    """Encode rows as CSV, one chunk per EXPORT_BATCH_ROWS rows (header first)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _batches(rows, EXPORT_BATCH_ROWS):
+        writer.writerows([["" if row.get(c) is None else row.get(c) for c in columns] for row in batch])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_type(sql_type: str):
+    import pyarrow as pa
+
+    sql_type = (sql_type or "").upper()
+    decimal = re.match(r"(?:DECIMAL|NUMERIC)\((\d+),\s*(\d+)\)", sql_type)
+    if decimal:
+        return pa.decimal128(int(decimal.group(1)), int(decimal.group(2)))
+    if "INT" in sql_type:
+        return pa.int64()
+    if "FLOAT" in sql_type or "DOUBLE" in sql_type:
+        return pa.float64()
+    if sql_type.startswith("DATETIME") or sql_type.startswith("TIMESTAMP"):
+        return pa.timestamp("s")
+    if sql_type.startswith("DATE"):
+        return pa.date32()
+    return pa.string()
+
+
+def _arrow_value(value, arrow_type):
+    import pyarrow as pa
+
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type) and not isinstance(value, str):
+        return str(value)
+    if pa.types.is_decimal(arrow_type) and not isinstance(value, Decimal):
+        return Decimal(str(value))
+    return value
+
+
+def write_parquet(rows: Iterable[Dict], column_types: Dict[str, str], path: str):
+    """Write rows to a compressed Parquet file, one row group per EXPORT_BATCH_ROWS rows"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export requires the pyarrow package")
+
+    schema = pa.schema([(col, _arrow_type(sql_type)) for col, sql_type in column_types.items()])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for batch in _batches(rows, EXPORT_BATCH_ROWS):
+            arrays = [
+                pa.array([_arrow_value(row.get(field.name), field.type) for row in batch], type=field.type)
+                for field in schema
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def _xlsx_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (str, int, float, date, datetime)) or value is None:
+        return value
+    return str(value)
+
+
+def write_xlsx(rows: Iterable[Dict], columns: List[str], path: str, sheet_title: str = "Salary"):
+    """Write rows with openpyxl's write-only workbook (rows are not kept in memory)"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([_xlsx_value(row.get(c)) for c in columns])
+    workbook.save(path)
+
+
+def export_to_file(rows: Iterable[Dict], column_types: Dict[str, str], export_format: str) -> str:
+    """Write a parquet/xlsx export to a temporary file and return its path (caller deletes it)"""
+    fd, path = tempfile.mkstemp(suffix=f".{export_format}")
+    os.close(fd)
+    try:
+        if export_format == "parquet":
+            write_parquet(rows, column_types, path)
+        else:
+            write_xlsx(rows, list(column_types), path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def iter_file(path: str) -> Iterator[bytes]:
+    """Stream a finished export file, deleting it afterwards"""
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(EXPORT_READ_BYTES), b""):
+                yield block
+    finally:
+        os.remove(path)
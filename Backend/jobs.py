@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+# Concurrent background uploads (each holds its own DB connections)
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+
+# Where accepted uploads are spooled before a worker picks them up
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "ecl_uploads"))
+
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+_jobs: Dict[str, Dict] = {}
+_jobs_lock = threading.Lock()
+
+
+def spool_upload(file_obj, filename: str) -> str:
+    """Copy an uploaded file to the spool directory and return its path"""
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    suffix = os.path.splitext(filename)[1]
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(file_obj, out)
+    return path
+
+
+def _prune_finished_jobs():
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    with _jobs_lock:
+        expired = [
+            job_id for job_id, job in _jobs.items()
+            if job["finished_at"] and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del _jobs[job_id]
+
+
+def update_job(job_id: str, **fields):
+    with _jobs_lock:
+        if job_id in _jobs:
+            _jobs[job_id].update(fields)
+
+
+def job_progress(job_id: str) -> Callable:
+    """Progress callback for ingestion: progress(phase, year=None, rows=None)"""
+    def progress(phase: str, year: Optional[int] = None, rows: Optional[int] = None):
+        with _jobs_lock:
+            job = _jobs.get(job_id)
+            if job is None:
+                return
+            job["phase"] = phase
+            if year is not None and rows is not None:
+                job["rows_processed"][year] = rows
+    return progress
+
+
+def _run_job(job_id: str, fn: Callable, path: str, args: tuple):
+    update_job(job_id, status="running", started_at=time.time())
+    try:
+        result = fn(path, *args, progress=job_progress(job_id))
+        update_job(job_id, status="completed", phase="done", result=result)
+    except Exception as e:
+        error = getattr(e, "detail", None) or str(e)
+        with _jobs_lock:
+            _jobs[job_id]["status"] = "failed"
+            _jobs[job_id]["errors"].append(error)
+    finally:
+        update_job(job_id, finished_at=time.time())
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def submit_job(kind: str, fn: Callable, path: str, *args) -> str:
+    """
+    Run fn(path, *args, progress=...) on the worker pool.
+    The spooled file at path is removed once the job finishes.
+    """
+    _prune_finished_jobs()
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "phase": "queued",
+            "rows_processed": {},
+            "errors": [],
+            "result": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+    _executor.submit(_run_job, job_id, fn, path, args)
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "rows_processed": dict(job["rows_processed"]), "errors": list(job["errors"])}
+
+
+def list_jobs() -> list:
+    with _jobs_lock:
+        return [
+            {k: job[k] for k in ("job_id", "kind", "status", "phase", "created_at", "finished_at")}
+            for job in _jobs.values()
+        ]
@@ -1,23 +1,98 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Depends, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Callable, List, Optional
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
+import base64
+import json
+import os
+import re
+import time
 
 from db_utils import (
     insert_salary_register,
+    enrich_salary_records_with_master,
     get_existing_columns,
-    add_column,
+    alter_salary_table,
+    ensure_salary_indexes,
     table_exists,
+    table_is_empty,
     create_salary_table,
-    get_table_columns,
     get_table_column_types,
-    get_employee_from_master
+    get_employee_from_master_async,
+    get_employee_master_stats_async,
+    lookup_employees,
+    employee_cache_stats,
+    cleanup_employee_master,
+    MASTER_CLEANUP_BATCH_SIZE,
+    table_exists_async,
+    get_salary_page_async,
+    invalidate_schema_cache,
+    table_ddl_lock,
+    stream_salary_rows,
+    get_fiscal_year_totals,
+    rebuild_monthly_summary,
+    get_monthly_summary,
+    SALARY_KEY_COLUMNS
+)
+from db import get_db, get_async_db, session_scope, pool_status
+from jobs import spool_upload, submit_job, get_job, list_jobs
+from readers import iter_salary_chunks, SUPPORTED_EXTENSIONS
+from normalizer import normalize_columns
+from month_parser import parse_month_year
+from components import (
+    components_enabled,
+    core_column_definitions,
+    split_components,
+    write_components,
+    split_fields,
+    attach_components,
+    attach_components_stream,
+    add_fiscal_year_components,
+    component_names,
+    attribute_names,
+    CORE_COLUMNS,
+    ATTRIBUTES_COLUMN
+)
+from exporters import iter_csv, export_to_file, iter_file, EXPORT_FORMATS, MEDIA_TYPES
+from year_cache import snapshot_for, query_snapshot, aggregate_snapshot, bump_year_version, drop_snapshots
+from manifest import (
+    file_sha256,
+    find_upload,
+    record_upload,
+    row_hash,
+    filter_changed_records,
+    save_row_hashes,
+    clear_year_hashes
 )
-from db import SessionLocal
 
 app = FastAPI(title="ECL Salary Ingestion API")
 
+# Largest page size accepted by the keyset-paginated salary endpoint
+SALARY_PAGE_MAX = 5000
+
+# Rows with unparseable month_year echoed back in the upload response
+REJECTED_ROWS_REPORT_LIMIT = 100
+
+# Year partitions of one upload chunk processed concurrently (shared by all uploads;
+# each worker holds its own DB connection)
+PARTITION_WORKERS = int(os.getenv("PARTITION_WORKERS", "4"))
+_partition_pool = ThreadPoolExecutor(max_workers=PARTITION_WORKERS, thread_name_prefix="partition")
+
+# Text columns whose longest value is at most VARCHAR_INFER_MAX characters become
+# VARCHAR (sized from VARCHAR_BUCKETS) instead of TEXT. Kept small: VARCHAR counts
+# fully toward InnoDB's 65535-byte row limit, 4 bytes per character in utf8mb4.
+VARCHAR_INFER_MAX = int(os.getenv("VARCHAR_INFER_MAX", "64"))
+VARCHAR_BUCKETS = (16, 32, 64, 128, 255)
+
+# Most keys accepted by one /employees/lookup request
+EMPLOYEE_LOOKUP_MAX = 5000
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -30,22 +105,39 @@ app.add_middleware(
 
 
 
+def _json_safe_column(series: pd.Series) -> list:
+    """One column as Python scalars with NaN/NaT/NA mapped to None"""
+    values = series.astype(object).where(series.notna(), None).tolist()
+    if series.dtype == object:
+        # Object columns can still hold numpy scalars
+        values = [v.item() if isinstance(v, np.generic) else v for v in values]
+    return values
+
+
 def json_safe_records(df: pd.DataFrame):
     """Convert DataFrame to JSON-safe records by replacing NaN/inf values"""
     df = df.replace([np.inf, -np.inf], np.nan)
-    records = df.to_dict(orient="records")
-    
-    for record in records:
-        for key, value in list(record.items()):
-            if pd.isna(value) or value is np.nan or (isinstance(value, float) and np.isnan(value)):
-                record[key] = None
-            elif isinstance(value, (np.integer, np.floating)):
-                if np.isnan(value) or np.isinf(value):
-                    record[key] = None
-                else:
-                    record[key] = value.item()
+    if df.shape[1] == 0:
+        return [{} for _ in range(len(df))]
     
-    return records
+    columns = [_json_safe_column(df.iloc[:, i]) for i in range(df.shape[1])]
+    keys = df.columns.tolist()
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def varchar_length(max_len: int) -> Optional[int]:
+    """VARCHAR size for values up to max_len characters (2x headroom, bucketed), None if too long"""
+    if max_len > VARCHAR_INFER_MAX:
+        return None
+    for size in VARCHAR_BUCKETS:
+        if size >= max_len * 2:
+            return size
+    return VARCHAR_BUCKETS[-1]
+
+
+def _max_text_length(series) -> int:
+    non_null = series.dropna()
+    return int(non_null.astype(str).str.len().max()) if len(non_null) else 0
 
 
 def infer_sql_type(series, column_name: str):
@@ -76,7 +168,51 @@ def infer_sql_type(series, column_name: str):
     if pd.api.types.is_float_dtype(series):
         return "DECIMAL(15,2)"
 
-    return "TEXT"
+    # Short text (areas, cost centers, groups) gets an indexable, in-row VARCHAR
+    size = varchar_length(_max_text_length(non_null))
+    return f"VARCHAR({size})" if size else "TEXT"
+
+
+def _numeric_widening(series: pd.Series, current: str) -> Optional[str]:
+    """
+    Type for a numeric column whose new values no longer fit it: an integer
+    column receiving decimals becomes DECIMAL, any numeric column receiving
+    text becomes VARCHAR/TEXT (roomy enough for the numbers already stored)
+    """
+    non_null = series.dropna()
+    numbers = pd.to_numeric(non_null, errors="coerce")
+    if numbers.notna().all():
+        if "INT" in current and (numbers % 1 != 0).any():
+            return "DECIMAL(15,2)"
+        return None
+    size = varchar_length(_max_text_length(non_null))
+    return f"VARCHAR({max(size, 32)})" if size else "TEXT"
+
+
+def widened_column_types(df: pd.DataFrame, column_types: dict) -> dict:
+    """
+    Existing columns too narrow for this data (short VARCHARs, integer columns
+    receiving decimals, numeric columns receiving text), with the type to widen them to.
+    Column types are inferred per upload chunk, so later chunks can need wider types.
+    """
+    widened = {}
+    for col in df.columns:
+        if col in ("person_no", "personnel_area", "month_year", "year") or not df[col].notna().any():
+            continue
+        current = column_types.get(col, "").upper()
+        if re.match(r"(TINY|SMALL|MEDIUM|BIG)?INT|DECIMAL|NUMERIC|FLOAT|DOUBLE", current):
+            new_type = _numeric_widening(df[col], current)
+            if new_type:
+                widened[col] = new_type
+            continue
+        match = re.match(r"VARCHAR\((\d+)\)", current)
+        if not match:
+            continue
+        max_len = _max_text_length(df[col])
+        if max_len > int(match.group(1)):
+            size = varchar_length(max_len)
+            widened[col] = f"VARCHAR({max(size, max_len)})" if size else "TEXT"
+    return widened
 
 
 @app.get("/")
@@ -84,99 +220,101 @@ def health():
     return {"status": "running", "database": "MySQL"}
 
 
+@app.get("/db/pool")
+def get_pool_status():
+    """Connection pool occupancy and checkout wait times"""
+    return {"status": "success", "pool": pool_status()}
+
+
+@app.post("/schema/refresh")
+def refresh_schema_cache(table_name: str = None):
+    """Drop cached table metadata so the next lookup re-reads it from MySQL"""
+    invalidate_schema_cache(table_name)
+    return {"status": "success", "refreshed": table_name or "all"}
+
+
+@app.post("/schema/indexes/{year}")
+def add_salary_indexes(year: int, session=Depends(get_db)):
+    """Add the configured secondary indexes to a year table created before they existed"""
+    table_name = f"salaryregister{year}"
+    if not table_exists(table_name):
+        raise HTTPException(404, f"No data for year {year}")
+    try:
+        added = ensure_salary_indexes(table_name, session)
+    except Exception as e:
+        raise HTTPException(500, str(e))
+    return {"status": "success", "table": table_name, "indexes_added": added}
+
+
 @app.get("/employee/{person_no}/{personnel_area}")
-async def get_employee(person_no: str, personnel_area: str):
+async def get_employee(person_no: str, personnel_area: str, session=Depends(get_async_db)):
     """Get employee details from employee_master"""
-    employee = get_employee_from_master(person_no, personnel_area)
+    employee = await get_employee_from_master_async(person_no, personnel_area, session)
     if employee:
         return {"status": "success", "employee": employee}
     else:
         raise HTTPException(404, f"Employee not found: {person_no} in {personnel_area}")
 
 
+class EmployeeKey(BaseModel):
+    person_no: str
+    personnel_area: str
+
+
+class EmployeeLookupRequest(BaseModel):
+    keys: List[EmployeeKey] = Field(..., max_length=EMPLOYEE_LOOKUP_MAX)
+
+
+@app.post("/employees/lookup")
+def lookup_employee_cards(request: EmployeeLookupRequest, session=Depends(get_db)):
+    """Employee details for many (person_no, personnel_area) keys in one call"""
+    try:
+        found = lookup_employees(((k.person_no, k.personnel_area) for k in request.keys), session)
+    except Exception as e:
+        raise HTTPException(500, f"Error looking up employees: {str(e)}")
+    return {
+        "status": "success",
+        "employees": [employee for employee in found.values() if employee is not None],
+        "not_found": [
+            {"person_no": person_no, "personnel_area": personnel_area}
+            for (person_no, personnel_area), employee in found.items() if employee is None
+        ]
+    }
+
+
+@app.get("/employees/cache")
+def get_employee_cache_stats():
+    """Hit/miss counters and occupancy of the employee lookup cache"""
+    return {"status": "success", "cache": employee_cache_stats()}
+
+
 @app.get("/employee-master/stats")
-async def get_employee_master_stats():
+async def get_employee_master_stats(session=Depends(get_async_db)):
     """Get statistics about employee_master table"""
-    session = SessionLocal()
     try:
-        # Get total count
-        count_query = text("SELECT COUNT(*) as total FROM employee_master")
-        total = session.execute(count_query).scalar()
-        
-        # Get sample records
-        sample_query = text("""
-            SELECT * FROM employee_master 
-            ORDER BY month_year DESC 
-            LIMIT 5
-        """)
-        sample_result = session.execute(sample_query)
-        sample_data = [dict(row._mapping) for row in sample_result]
-        
-        # Check for duplicates
-        dup_query = text("""
-            SELECT person_no, personnel_area, COUNT(*) as cnt
-            FROM employee_master
-            GROUP BY person_no, personnel_area
-            HAVING cnt > 1
-        """)
-        dup_result = session.execute(dup_query)
-        duplicate_count = len(list(dup_result))
-        
-        # Get unique count
-        unique_query = text("""
-            SELECT COUNT(DISTINCT CONCAT(person_no, '-', personnel_area)) as unique_count
-            FROM employee_master
-        """)
-        unique_count = session.execute(unique_query).scalar()
-        
-        return {
-            "status": "success",
-            "total_employees": total,
-            "unique_employees": unique_count,
-            "duplicates_found": duplicate_count,
-            "sample_records": sample_data
-        }
+        stats = await get_employee_master_stats_async(session)
     except Exception as e:
         raise HTTPException(500, f"Error fetching stats: {str(e)}")
-    finally:
-        session.close()
+    return {"status": "success", **stats}
 
 
 @app.post("/employee-master/cleanup")
-async def cleanup_employee_master():
-    """Remove duplicate employees, keeping only the latest record"""
-    session = SessionLocal()
+def cleanup_employee_master_duplicates(
+    dry_run: bool = False,
+    batch_size: int = Query(MASTER_CLEANUP_BATCH_SIZE, ge=1, le=50000),
+    sync_current: bool = False,
+    session=Depends(get_db),
+):
+    """
+    Remove duplicate employees, keeping only the latest record.
+    Deletes run in primary-key batches of batch_size rows; dry_run=true only reports counts.
+    sync_current=true refreshes the employee_current table before pruning.
+    """
     try:
-        # Find and delete older duplicates
-        delete_query = text("""
-            DELETE t1 FROM employee_master t1
-            INNER JOIN employee_master t2 
-            WHERE t1.person_no = t2.person_no 
-            AND t1.personnel_area = t2.personnel_area
-            AND t1.month_year < t2.month_year
-        """)
-        result = session.execute(delete_query)
-        session.commit()
-        
-        deleted_count = result.rowcount
-        
-        # Get remaining unique count
-        unique_query = text("""
-            SELECT COUNT(DISTINCT CONCAT(person_no, '-', personnel_area)) as unique_count
-            FROM employee_master
-        """)
-        unique_count = session.execute(unique_query).scalar()
-        
-        return {
-            "status": "success",
-            "duplicates_removed": deleted_count,
-            "unique_employees_remaining": unique_count
-        }
+        result = cleanup_employee_master(dry_run, batch_size, sync_current, session)
     except Exception as e:
-        session.rollback()
         raise HTTPException(500, f"Error cleaning up: {str(e)}")
-    finally:
-        session.close()
+    return {"status": "success", **result}
 
 
 # @app.post("/upload/area-master")
@@ -233,150 +371,36 @@ async def cleanup_employee_master():
 #         session.close()
 
 
-@app.post("/upload/salary-xlsx")
-async def upload_salary_xlsx(file: UploadFile = File(...)):
-    """Upload and process salary Excel file with year-wise table segregation"""
-    
-    if not file.filename.lower().endswith((".xlsx", ".xls")):
-        raise HTTPException(400, "Invalid file type. Only .xlsx or .xls allowed")
-
-    try:
-        df = pd.read_excel(file.file)
-    except Exception as e:
-        raise HTTPException(400, f"Error reading Excel file: {str(e)}")
-
-    original_columns = df.columns.tolist()
-    
-    # Normalize column names
-    df.columns = (
-        df.columns.astype(str)
-        .str.lower()
-        .str.strip()
-        .str.replace(" ", "_", regex=False)
-        .str.replace("-", "_", regex=False)
-        .str.replace(".", "_", regex=False)
-        .str.replace("(", "", regex=False)
-        .str.replace(")", "", regex=False)
-        .str.replace("/", "_", regex=False)
-        .str.replace("\\", "_", regex=False)
-        .str.replace(":", "_", regex=False)
-        .str.replace(";", "_", regex=False)
-        .str.replace(",", "_", regex=False)
-        .str.replace("'", "", regex=False)
-        .str.replace('"', "", regex=False)
-        .str.replace("&", "and", regex=False)
-        .str.replace("%", "percent", regex=False)
-        .str.replace("#", "num", regex=False)
-        .str.replace("@", "at", regex=False)
-        .str.replace("+", "plus", regex=False)
-        .str.replace("*", "", regex=False)
-        .str.replace("=", "", regex=False)
-        .str.replace("<", "", regex=False)
-        .str.replace(">", "", regex=False)
-        .str.replace("?", "", regex=False)
-        .str.replace("!", "", regex=False)
-        .str.replace("$", "", regex=False)
-        .str.replace("^", "", regex=False)
-        .str.replace("|", "_", regex=False)
-        .str.replace("[", "", regex=False)
-        .str.replace("]", "", regex=False)
-        .str.replace("{", "", regex=False)
-        .str.replace("}", "", regex=False)
-    )
-    
-    df.columns = df.columns.str.replace(r'_+', '_', regex=True)
-    df.columns = df.columns.str.strip('_')
-
-    rename_map = {
-        "name_of_employee": "employee_name",
-        "basic": "basic_salary",
-        "month": "month_year"
-    }
-    df.rename(columns=rename_map, inplace=True)
-    
-    column_order = []
-    for orig_col in original_columns:
-        normalized = (orig_col.lower().strip()
-                     .replace(" ", "_")
-                     .replace("-", "_")
-                     .replace(".", "_")
-                     .replace("(", "")
-                     .replace(")", "")
-                     .replace("/", "_")
-                     .replace("\\", "_")
-                     .replace(":", "_")
-                     .replace(";", "_")
-                     .replace(",", "_")
-                     .replace("'", "")
-                     .replace('"', "")
-                     .replace("&", "and")
-                     .replace("%", "percent")
-                     .replace("#", "num")
-                     .replace("@", "at")
-                     .replace("+", "plus")
-                     .replace("*", "")
-                     .replace("=", "")
-                     .replace("<", "")
-                     .replace(">", "")
-                     .replace("?", "")
-                     .replace("!", "")
-                     .replace("$", "")
-                     .replace("^", "")
-                     .replace("|", "_")
-                     .replace("[", "")
-                     .replace("]", "")
-                     .replace("{", "")
-                     .replace("}", ""))
-        import re
-        normalized = re.sub(r'_+', '_', normalized).strip('_')
-        final_col = rename_map.get(normalized, normalized)
-        column_order.append(final_col)
+def prepare_salary_frame(df: pd.DataFrame):
+    """
+    Normalize headers, parse month_year and add year for one chunk of an upload.
+    Returns (frame, invalid_date_count, rejected) where rejected lists up to
+    REJECTED_ROWS_REPORT_LIMIT rows with their original month_year values.
+    """
+    column_order = list(normalize_columns(tuple(df.columns)))
+    df.columns = column_order
 
     required = {"person_no", "month_year", "personnel_area"}
     if not required.issubset(df.columns):
         missing = required - set(df.columns)
         raise HTTPException(400, f"Missing required columns: {missing}")
 
-    # Store original values before conversion for debugging
-    original_month_year = df["month_year"].copy()
-    
-    # FIXED: Better date parsing that handles multiple formats
-    # Try parsing with different formats
-    df["month_year"] = pd.to_datetime(df["month_year"], format="mixed", errors="coerce")
-    
-    # If that fails, try specific format for "January 2025" style dates
-    if df["month_year"].isna().any():
-        # Try to parse as "Month YYYY" format
-        mask = df["month_year"].isna()
-        df.loc[mask, "month_year"] = pd.to_datetime(
-            original_month_year[mask], 
-            format="%B %Y",  # e.g., "January 2025"
-            errors="coerce"
-        )
-    
-    # Check if there are still invalid dates after all attempts
-    invalid_dates_mask = df["month_year"].isna()
-    if invalid_dates_mask.any():
-        # Get the ORIGINAL values (before conversion) to show what's actually in Excel
-        invalid_rows = df[invalid_dates_mask].index.tolist()[:5]  # Show first 5
-        original_values = original_month_year.iloc[invalid_rows].tolist()
-        
-        # Option 1: Drop rows with invalid dates and continue
-        print(f"Warning: Found {invalid_dates_mask.sum()} rows with invalid dates. Dropping them.")
+    # Parse distinct values only; keep the originals of rejected rows for the response
+    parsed = parse_month_year(df["month_year"])
+    invalid_dates_mask = parsed.isna()
+    invalid_count = int(invalid_dates_mask.sum())
+    rejected = []
+    if invalid_count:
+        originals = df.loc[invalid_dates_mask, "month_year"].head(REJECTED_ROWS_REPORT_LIMIT)
+        rejected = [
+            {"row": int(idx), "month_year": None if pd.isna(value) else str(value)}
+            for idx, value in originals.items()
+        ]
+        # Drop rows with invalid dates and continue; the caller fails the
+        # upload only if no row in the whole file had a valid date
         df = df[~invalid_dates_mask].copy()
-        
-        # If all rows are invalid, raise error
-        if len(df) == 0:
-            raise HTTPException(
-                400, 
-                f"All rows have invalid dates. Sample original values at rows {invalid_rows}: {original_values}"
-            )
-        
-        # Option 2: Uncomment below to raise error instead of dropping
-        # raise HTTPException(
-        #     400, 
-        #     f"Invalid dates found in month_year column at rows: {invalid_rows}. Original values: {original_values}"
-        # )
+        parsed = parsed[~invalid_dates_mask]
+    df["month_year"] = parsed
     
     df["year"] = df["month_year"].dt.year
     df["month_year"] = df["month_year"].dt.strftime("%Y-%m-%d")
@@ -385,286 +409,571 @@ async def upload_salary_xlsx(file: UploadFile = File(...)):
         column_order.append("year")
     
     df = df[column_order]
-    
-    years = df["year"].unique()
-    
-    results = {}
-    employees_synced = set()
-    
-    for year in years:
-        year_int = int(year)
-        table_name = f"salaryregister{year_int}"
-        
-        year_data = df[df["year"] == year_int].copy()
-        
-        try:
+    return df, invalid_count, rejected
+
+
+def _prepare_year_partition(year_int: int, year_data: pd.DataFrame, force: bool) -> dict:
+    """
+    Worker: create/extend one year table and find the rows that need writing.
+    Runs on its own connection.
+    """
+    started = time.perf_counter()
+    table_name = f"salaryregister{year_int}"
+    with session_scope() as session:
+        # In components mode only the core columns live on the year table;
+        # pay heads go to salary_components and never need DDL
+        table_data = year_data[[c for c in year_data.columns if c in CORE_COLUMNS]] if components_enabled() \
+            else year_data
+        # A new or emptied table gets every row: hashes left over from dropped
+        # or deleted data would otherwise mark them all as unchanged
+        reload = False
+        # Concurrent uploads of the same year serialize their DDL; the schema is
+        # re-read under the lock so each sees what the previous one created or added
+        with table_ddl_lock(table_name):
+            invalidate_schema_cache(table_name)
             if not table_exists(table_name):
                 column_definitions = {}
-                for col in year_data.columns:
-                    column_definitions[col] = infer_sql_type(year_data[col], col)
-
-                
-                create_salary_table(table_name, column_definitions)
-                results[year_int] = {
-                    "table": table_name,
-                    "status": "created",
-                    "rows": len(year_data)
-                }
+                for col in table_data.columns:
+                    column_definitions[col] = infer_sql_type(table_data[col], col)
+                if components_enabled():
+                    column_definitions = core_column_definitions(column_definitions)
+                create_salary_table(table_name, column_definitions, session, year=year_int)
+                clear_year_hashes(year_int, session)
+                status, reload = "created", True
             else:
-                existing_cols = get_table_columns(table_name)
-                new_cols = set(year_data.columns) - existing_cols
-                
-                if new_cols:
-                    for col in new_cols:
-                        col_type = infer_sql_type(year_data[col], col)
-                        add_column(table_name, col, col_type)
-
-                
-                results[year_int] = {
-                    "table": table_name,
-                    "status": "updated",
-                    "rows": len(year_data),
-                    "new_columns": list(new_cols) if new_cols else []
-                }
-            
-            records = json_safe_records(year_data)
-            
-            unique_employees = set()
-            for record in records:
-                emp_key = f"{record.get('person_no')}_{record.get('personnel_area')}"
-                unique_employees.add(emp_key)
-                employees_synced.add(emp_key)
-            
-            insert_salary_register(table_name, records)
-            
-            results[year_int]["unique_employees"] = len(unique_employees)
-            
+                status = "updated"
+
+            # All new pay heads and widened columns go into a single ALTER TABLE
+            # (a no-op for a table this call created, unless another process created it)
+            column_types = get_table_column_types(table_name)
+            new_cols = [col for col in table_data.columns if col not in column_types]
+            add_columns = {col: infer_sql_type(table_data[col], col) for col in new_cols}
+            if components_enabled() and ATTRIBUTES_COLUMN not in column_types:
+                add_columns[ATTRIBUTES_COLUMN] = "JSON"
+            alter_salary_table(
+                table_name,
+                add_columns=add_columns,
+                modify_columns=widened_column_types(table_data, column_types),
+                session=session
+            )
+
+        if status == "updated" and table_is_empty(table_name, session):
+            clear_year_hashes(year_int, session)
+            reload = True
+
+        records = json_safe_records(year_data)
+        # Only rows whose content differs from what is stored get written
+        if force or reload:
+            changed, hashes, unchanged = records, [row_hash(r) for r in records], 0
+        else:
+            changed, hashes, unchanged = filter_changed_records(year_int, records, session)
+
+    return {
+        "table": table_name, "status": status, "new_columns": new_cols,
+        "records": records, "changed": changed, "hashes": hashes, "unchanged": unchanged,
+        "seconds": time.perf_counter() - started
+    }
+
+
+def _write_year_partition(year_int: int, table_name: str, enriched: list, changed: list, hashes: list) -> float:
+    """Worker: upsert one year's (already enriched) rows and their hashes in its own transaction"""
+    started = time.perf_counter()
+    with session_scope() as session:
+        if components_enabled():
+            core_rows, component_rows = split_components(enriched)
+            insert_salary_register(table_name, core_rows, session=session, enrich=False)
+            try:
+                write_components(session, core_rows, component_rows)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                raise Exception(f"Failed to write salary components: {str(e)}")
+        else:
+            insert_salary_register(table_name, enriched, session=session, enrich=False)
+        save_row_hashes(year_int, changed, hashes, session)
+        # Invalidates the year's columnar snapshot
+        bump_year_version(session, year_int)
+        session.commit()
+    return time.perf_counter() - started
+
+
+def _run_partitions(fn, tasks: dict) -> dict:
+    """
+    Run fn(year, *args) for every year on the partition pool. Every year is waited
+    for before a failure is raised, so the error lists what each year did.
+    """
+    futures = {year: _partition_pool.submit(fn, year, *args) for year, args in tasks.items()}
+    wait(list(futures.values()))
+    results = {}
+    errors = {}
+    for year, future in futures.items():
+        try:
+            results[year] = future.result()
         except Exception as e:
-            raise HTTPException(500, f"Error processing year {year_int}: {str(e)}")
+            errors[year] = str(getattr(e, "detail", None) or e)
+    if errors:
+        raise HTTPException(500, {
+            "message": f"Error processing year {', '.join(str(y) for y in errors)}",
+            "years": {year: {"status": "failed", "error": errors[year]} if year in errors else {"status": "completed"}
+                      for year in futures}
+        })
+    return results
+
+
+def write_salary_partitions(df: pd.DataFrame, results: dict, year_employees: dict, progress: Callable,
+                            force: bool = False, session=None, timing: Optional[dict] = None):
+    """
+    Create/extend the year tables for one prepared chunk and upsert its rows.
+    Years are processed concurrently on the partition pool, each on its own
+    connection; employee-master enrichment runs once for the whole chunk.
+    Rows already stored with identical content are skipped unless force is set.
+    """
+    timing = timing if timing is not None else {}
+    years = [int(year) for year in df["year"].unique()]
+
+    # Phase 1 (parallel): DDL and change detection per year
+    prepared = _run_partitions(_prepare_year_partition, {
+        year: (df[df["year"] == year], force) for year in years
+    })
+
+    # Phase 2: one master upsert + lookup for every changed row of every year
+    started = time.perf_counter()
+    all_changed = [record for year in years for record in prepared[year]["changed"]]
+    try:
+        enriched = enrich_salary_records_with_master(all_changed, session)
+    except Exception as e:
+        raise HTTPException(500, f"Error enriching records: {str(e)}")
+    timing["enrich_seconds"] = timing.get("enrich_seconds", 0.0) + time.perf_counter() - started
+
+    # Phase 3 (parallel): upsert per year
+    tasks = {}
+    offset = 0
+    for year in years:
+        part = prepared[year]
+        count = len(part["changed"])
+        if count:
+            tasks[year] = (part["table"], enriched[offset:offset + count], part["changed"], part["hashes"])
+        offset += count
+    written = _run_partitions(_write_year_partition, tasks)
+
+    for year in years:
+        part = prepared[year]
+        entry = results.setdefault(year, {"table": part["table"], "status": part["status"], "rows": 0})
+        if part["status"] == "updated":
+            added = entry.setdefault("new_columns", [])
+            added.extend(col for col in part["new_columns"] if col not in added)
+
+        unique_employees = year_employees.setdefault(year, set())
+        for record in part["records"]:
+            unique_employees.add(f"{record.get('person_no')}_{record.get('personnel_area')}")
+
+        entry["rows"] += len(part["records"])
+        entry["rows_written"] = entry.get("rows_written", 0) + len(part["changed"])
+        entry["rows_unchanged"] = entry.get("rows_unchanged", 0) + part["unchanged"]
+        entry["unique_employees"] = len(unique_employees)
+        partition_timing = entry.setdefault("timing", {"prepare_seconds": 0.0, "write_seconds": 0.0})
+        partition_timing["prepare_seconds"] = round(partition_timing["prepare_seconds"] + part["seconds"], 3)
+        partition_timing["write_seconds"] = round(partition_timing["write_seconds"] + written.get(year, 0.0), 3)
+        progress("writing", year=year, rows=entry["rows"])
+
+
+def ingest_salary_file(source, filename: str, force: bool = False, progress: Optional[Callable] = None,
+                       chunk_rows: Optional[int] = None, session=None):
+    """
+    Parse a salary file (path or file object) chunk by chunk and write each chunk
+    into the year-wise tables before reading the next, so memory is bounded by the
+    chunk size. progress(phase, year=None, rows=None) reports how far it got.
+    A file identical to an earlier upload is skipped unless force is set.
+    Manifest checks and master enrichment run on one session (the request's, or
+    its own for background jobs); year partitions are written on their own connections.
+    """
+    progress = progress or (lambda phase, year=None, rows=None: None)
+    with session_scope(session) as session:
+        return _ingest_salary_file(source, filename, force, progress, chunk_rows, session)
+
+
+def _ingest_salary_file(source, filename: str, force: bool, progress: Callable, chunk_rows: Optional[int],
+                        session):
+
+    file_hash = file_sha256(source)
+    if not force:
+        previous = find_upload(file_hash, session)
+        if previous:
+            return {
+                "status": "unchanged",
+                "message": "Identical file was already uploaded",
+                "file_hash": file_hash,
+                "previous_upload": previous
+            }
+
+    progress("parsing")
+
+    started = time.perf_counter()
+    timing = {"enrich_seconds": 0.0}
+    results = {}
+    year_employees = {}
+    total_rows = 0
+    invalid_total = 0
+    rejected_rows = []
+
+    chunks = iter_salary_chunks(source, filename, chunk_rows)
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            break
+        except Exception as e:
+            raise HTTPException(400, f"Error reading file: {str(e)}")
+
+        df, invalid_count, rejected = prepare_salary_frame(chunk)
+        invalid_total += invalid_count
+        rejected_rows += rejected[:REJECTED_ROWS_REPORT_LIMIT - len(rejected_rows)]
+
+        write_salary_partitions(df, results, year_employees, progress, force, session, timing)
+        total_rows += len(df)
+        progress("parsing")
+
+    if total_rows == 0 and invalid_total:
+        invalid_rows = [r["row"] for r in rejected_rows[:5]]
+        invalid_values = [r["month_year"] for r in rejected_rows[:5]]
+        raise HTTPException(
+            400, 
+            f"All rows have invalid dates. Sample original values at rows {invalid_rows}: {invalid_values}"
+        )
+
+    employees_synced = set().union(*year_employees.values()) if year_employees else set()
+    record_upload(file_hash, filename, total_rows, list(results), session)
     
     return {
         "status": "success",
-        "total_rows_processed": len(df),
+        "total_rows_processed": total_rows,
         "employees_synced": len(employees_synced),
-        "years_processed": results
+        "years_processed": results,
+        "rejected_rows": invalid_total,
+        "rejected_samples": rejected_rows,
+        "timing": {
+            "enrich_seconds": round(timing["enrich_seconds"], 3),
+            "total_seconds": round(time.perf_counter() - started, 3)
+        }
     }
 
+
+@app.post("/upload/salary-xlsx")
+def upload_salary_xlsx(response: Response, file: UploadFile = File(...), background: bool = False,
+                       force: bool = False, session=Depends(get_db)):
+    """
+    Upload and process salary Excel/CSV file with year-wise table segregation.
+    With background=true the file is spooled to disk, processed on the worker
+    pool and 202 is returned with a job id to poll at /jobs/{job_id}.
+    force=true re-processes and rewrites every row even if identical content was uploaded before.
+    """
+    
+    if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(400, f"Invalid file type. Only {', '.join(SUPPORTED_EXTENSIONS)} allowed")
+
+    if background:
+        path = spool_upload(file.file, file.filename)
+        job_id = submit_job("salary-xlsx", ingest_salary_file, path, file.filename, force)
+        response.status_code = 202
+        return {"status": "accepted", "job_id": job_id}
+
+    return ingest_salary_file(file.file, file.filename, force, session=session)
+
+
+@app.get("/jobs")
+def get_jobs():
+    return {"status": "success", "jobs": list_jobs()}
+
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    """Phase, per-year rows processed, errors and final result of a background upload"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(404, f"Job not found: {job_id}")
+    return job
+
+def encode_cursor(row: dict) -> str:
+    """Opaque keyset cursor for the (person_no, personnel_area, month_year) key of a row"""
+    key = [str(row["person_no"]), str(row["personnel_area"]), str(row["month_year"])]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        person_no, personnel_area, month_year = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return person_no, personnel_area, month_year
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(jsonable_encoder(row)) + "\n"
+
+
+def salary_query_params(
+    personnel_area: Optional[List[str]] = Query(None),
+    month_from: Optional[str] = None,
+    month_to: Optional[str] = None,
+    person_no: Optional[str] = None,
+    name: Optional[str] = None,
+    fields: Optional[str] = None,
+    order_by: Optional[str] = None,
+) -> dict:
+    """Shared filter / projection / sort query parameters for salary reads"""
+    return {
+        "filters": {
+            "personnel_area": personnel_area,
+            "month_from": month_from,
+            "month_to": month_to,
+            "person_no": person_no,
+            "name": name,
+        },
+        "fields": [f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        "order_by": order_by,
+    }
+
+
 @app.get("/salary/all/{year}")
-def get_all_salary(year: int):
+async def get_all_salary(
+    year: int,
+    limit: Optional[int] = Query(None, ge=1, le=SALARY_PAGE_MAX),
+    cursor: Optional[str] = None,
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    query: dict = Depends(salary_query_params),
+    session=Depends(get_async_db),
+):
     table_name = f"salaryregister{year}"
 
-    if not table_exists(table_name):
+    if not await table_exists_async(table_name):
         raise HTTPException(status_code=404, detail=f"No data for year {year}")
 
-    session = SessionLocal()
+    if (limit is not None or cursor) and query["order_by"]:
+        raise HTTPException(400, "order_by cannot be combined with keyset pagination")
+    if output == "ndjson" and (limit is not None or cursor):
+        raise HTTPException(400, "limit and cursor are not supported with format=ndjson")
+
+    requested = query["fields"]
+    after = decode_cursor(cursor) if cursor else None
+
+    # Closed years are answered from their Parquet snapshot when one is current
+    # (and it can reproduce MySQL's order for this request)
+    if output == "json":
+        path = await run_in_threadpool(snapshot_for, year, year_snapshot_source(year))
+        if path:
+            try:
+                rows = await run_in_threadpool(
+                    query_snapshot, path, query["filters"], requested, query["order_by"], after, limit
+                )
+            except ValueError as e:
+                raise HTTPException(400, str(e))
+            if rows is not None:
+                response = {"year": year, "total_records": len(rows), "data": rows, "source": "cache"}
+                if limit is not None:
+                    response["next_cursor"] = encode_cursor(rows[-1]) if len(rows) == limit else None
+                return response
+
+    # Components mode: select core columns, then pivot the requested pay heads onto each row
+    component_names = None
+    if components_enabled():
+        query["fields"], component_names = await run_in_threadpool(split_fields, table_name, requested)
+
+    if output == "ndjson":
+        try:
+            # Streams on the sync engine; Starlette iterates the generator in a worker thread
+            rows = await run_in_threadpool(stream_salary_rows, table_name, **query)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        if components_enabled():
+            rows = attach_components_stream(rows, component_names, requested)
+        return StreamingResponse(ndjson_lines(rows), media_type="application/x-ndjson")
+
     try:
-        query = text(f"SELECT * FROM {table_name}")
-        rows = session.execute(query).mappings().all()
+        rows = await get_salary_page_async(table_name, limit, after, **query, session=session)
+        if components_enabled():
+            keep = requested + [c for c in SALARY_KEY_COLUMNS if c not in requested] if requested and limit else requested
+            rows = await run_in_threadpool(attach_components, rows, component_names, keep)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return {
-            "year": year,
-            "total_records": len(rows),
-            "data": rows
-        }
+    response = {
+        "year": year,
+        "total_records": len(rows),
+        "data": rows
+    }
+    if limit is not None:
+        response["next_cursor"] = encode_cursor(rows[-1]) if len(rows) == limit else None
+    return response
+
+
+def export_column_types(table_name: str, year: int, fields: Optional[List[str]]) -> dict:
+    """Ordered {column: sql_type} of an export, for headers and the Parquet schema"""
+    column_types = get_table_column_types(table_name)
+    if components_enabled():
+        column_types.pop(ATTRIBUTES_COLUMN, None)
+        column_types.update({name: "DECIMAL(15,2)" for name in component_names(year)})
+        # Non-numeric extra columns are stored as JSON attributes
+        for name in attribute_names(table_name):
+            column_types.setdefault(name, "TEXT")
+    if not fields:
+        return column_types
+    if not components_enabled():
+        unknown = [f for f in fields if f not in column_types]
+        if unknown:
+            raise HTTPException(400, f"Unknown fields: {unknown}")
+    # In components mode an unknown field can only be a JSON attribute
+    return {f: column_types.get(f, "TEXT") for f in dict.fromkeys(fields)}
+
+
+@app.get("/salary/export/{year}")
+def export_salary(
+    year: int,
+    output: str = Query("csv", alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    query: dict = Depends(salary_query_params),
+):
+    """
+    Download a year (same filters / fields / order_by as /salary/all) as csv, parquet or xlsx.
+    Rows come from a server-side cursor; CSV streams as it is read, Parquet and
+    XLSX are written batch by batch to a temporary file that is streamed back.
+    """
+    table_name = f"salaryregister{year}"
+    if not table_exists(table_name):
+        raise HTTPException(404, f"No data for year {year}")
+
+    requested = query["fields"]
+    column_types = export_column_types(table_name, year, requested)
+    component_fields = None
+    if components_enabled():
+        query["fields"], component_fields = split_fields(table_name, requested)
 
+    try:
+        rows = stream_salary_rows(table_name, **query)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if components_enabled():
+        rows = attach_components_stream(rows, component_fields, requested)
+
+    headers = {"Content-Disposition": f'attachment; filename="salary_{year}.{output}"'}
+    if output == "csv":
+        return StreamingResponse(iter_csv(rows, list(column_types)), media_type=MEDIA_TYPES[output], headers=headers)
+
+    try:
+        path = export_to_file(rows, column_types, output)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(500, f"Error exporting year {year}: {str(e)}")
+    return StreamingResponse(iter_file(path), media_type=MEDIA_TYPES[output], headers=headers)
+
+
+def year_snapshot_source(year: int):
+    """Row source for building a year's columnar snapshot: (column_types, rows)"""
+    def source():
+        table_name = f"salaryregister{year}"
+        column_types = export_column_types(table_name, year, None)
+        rows = stream_salary_rows(table_name)
+        if components_enabled():
+            rows = attach_components_stream(rows)
+        return column_types, rows
+    return source
+
+
+@app.get("/salary/trend")
+def get_salary_trend(
+    years: List[int] = Query(...),
+    personnel_area: Optional[List[str]] = Query(None),
+    measures: Optional[str] = None,
+):
+    """
+    Monthly totals per personnel_area across several years. Closed years come
+    from their Parquet snapshot; the rest from the salary_monthly_summary rollup.
+    """
+    measure_list = [m.strip() for m in measures.split(",") if m.strip()] if measures else None
+    data = []
+    sources = {}
+    try:
+        for year in dict.fromkeys(years):
+            if not table_exists(f"salaryregister{year}"):
+                continue
+            path = snapshot_for(year, year_snapshot_source(year))
+            if path:
+                data += aggregate_snapshot(path, year, measure_list, personnel_area)
+                sources[year] = "cache"
+            else:
+                data += get_monthly_summary(year, personnel_area, measure_list)
+                sources[year] = "mysql"
+    except Exception as e:
+        raise HTTPException(500, f"Error fetching trend: {str(e)}")
+    return {"status": "success", "sources": sources, "total_records": len(data), "data": data}
 
-    finally:
-        session.close()
-    
-    if not file.filename.lower().endswith((".xlsx", ".xls")):
-        raise HTTPException(400, "Invalid file type. Only .xlsx or .xls allowed")
 
+@app.post("/salary/cache/clear")
+def clear_year_cache(year: Optional[int] = None):
+    """Delete columnar snapshots (they are rebuilt on the next read of a closed year)"""
+    return {"status": "success", "snapshots_removed": drop_snapshots(year)}
+
+
+@app.get("/salary/fy/{fy_start}")
+def get_fiscal_year_salary(
+    fy_start: int,
+    personnel_area: Optional[List[str]] = Query(None),
+    fields: Optional[str] = None,
+    session=Depends(get_db),
+):
+    """Per-employee totals for fiscal year fy_start-(fy_start+1), April to March"""
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
     try:
-        df = pd.read_excel(file.file)
+        if components_enabled():
+            core_fields = [f for f in field_list if f in CORE_COLUMNS] if field_list else None
+            result = get_fiscal_year_totals(fy_start, core_fields or None, personnel_area, session)
+            if result is not None:
+                add_fiscal_year_components(result, fy_start, field_list, personnel_area, session)
+        else:
+            result = get_fiscal_year_totals(fy_start, field_list, personnel_area, session)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
-        raise HTTPException(400, f"Error reading Excel file: {str(e)}")
+        raise HTTPException(500, f"Error fetching fiscal year totals: {str(e)}")
 
-    original_columns = df.columns.tolist()
-    
-    # Normalize column names
-    df.columns = (
-        df.columns.astype(str)
-        .str.lower()
-        .str.strip()
-        .str.replace(" ", "_", regex=False)
-        .str.replace("-", "_", regex=False)
-        .str.replace(".", "_", regex=False)
-        .str.replace("(", "", regex=False)
-        .str.replace(")", "", regex=False)
-        .str.replace("/", "_", regex=False)
-        .str.replace("\\", "_", regex=False)
-        .str.replace(":", "_", regex=False)
-        .str.replace(";", "_", regex=False)
-        .str.replace(",", "_", regex=False)
-        .str.replace("'", "", regex=False)
-        .str.replace('"', "", regex=False)
-        .str.replace("&", "and", regex=False)
-        .str.replace("%", "percent", regex=False)
-        .str.replace("#", "num", regex=False)
-        .str.replace("@", "at", regex=False)
-        .str.replace("+", "plus", regex=False)
-        .str.replace("*", "", regex=False)
-        .str.replace("=", "", regex=False)
-        .str.replace("<", "", regex=False)
-        .str.replace(">", "", regex=False)
-        .str.replace("?", "", regex=False)
-        .str.replace("!", "", regex=False)
-        .str.replace("$", "", regex=False)
-        .str.replace("^", "", regex=False)
-        .str.replace("|", "_", regex=False)
-        .str.replace("[", "", regex=False)
-        .str.replace("]", "", regex=False)
-        .str.replace("{", "", regex=False)
-        .str.replace("}", "", regex=False)
-    )
-    
-    df.columns = df.columns.str.replace(r'_+', '_', regex=True)
-    df.columns = df.columns.str.strip('_')
+    if result is None:
+        raise HTTPException(404, f"No data for financial year {fy_start}-{str(fy_start + 1)[-2:]}")
 
-    rename_map = {
-        "name_of_employee": "employee_name",
-        "basic": "basic_salary",
-        "month": "month_year"
+    return {
+        "financial_year": f"{fy_start}-{str(fy_start + 1)[-2:]}",
+        "tables": result["tables"],
+        "fields": result["fields"],
+        "total_employees": len(result["data"]),
+        "data": result["data"]
     }
-    df.rename(columns=rename_map, inplace=True)
-    
-    column_order = []
-    for orig_col in original_columns:
-        normalized = (orig_col.lower().strip()
-                     .replace(" ", "_")
-                     .replace("-", "_")
-                     .replace(".", "_")
-                     .replace("(", "")
-                     .replace(")", "")
-                     .replace("/", "_")
-                     .replace("\\", "_")
-                     .replace(":", "_")
-                     .replace(";", "_")
-                     .replace(",", "_")
-                     .replace("'", "")
-                     .replace('"', "")
-                     .replace("&", "and")
-                     .replace("%", "percent")
-                     .replace("#", "num")
-                     .replace("@", "at")
-                     .replace("+", "plus")
-                     .replace("*", "")
-                     .replace("=", "")
-                     .replace("<", "")
-                     .replace(">", "")
-                     .replace("?", "")
-                     .replace("!", "")
-                     .replace("$", "")
-                     .replace("^", "")
-                     .replace("|", "_")
-                     .replace("[", "")
-                     .replace("]", "")
-                     .replace("{", "")
-                     .replace("}", ""))
-        import re
-        normalized = re.sub(r'_+', '_', normalized).strip('_')
-        final_col = rename_map.get(normalized, normalized)
-        column_order.append(final_col)
 
-    required = {"person_no", "month_year", "personnel_area"}
-    if not required.issubset(df.columns):
-        missing = required - set(df.columns)
-        raise HTTPException(400, f"Missing required columns: {missing}")
 
-    # FIXED: Better date parsing that handles multiple formats
-    # Try parsing with different formats
-    df["month_year"] = pd.to_datetime(df["month_year"], format="mixed", errors="coerce")
-    
-    # If that fails, try specific format for "January 2025" style dates
-    if df["month_year"].isna().any():
-        # Try to parse as "Month YYYY" format
-        mask = df["month_year"].isna()
-        df.loc[mask, "month_year"] = pd.to_datetime(
-            df.loc[mask, "month_year"], 
-            format="%B %Y",  # e.g., "January 2025"
-            errors="coerce"
-        )
-    
-    # Check if there are still invalid dates
-    invalid_dates = df[df["month_year"].isna()]
-    if not invalid_dates.empty:
-        # Show which rows have invalid dates for debugging
-        invalid_rows = invalid_dates.index.tolist()[:5]  # Show first 5
-        sample_values = df.loc[invalid_rows, "month_year"].tolist() if "month_year" in df.columns else []
-        raise HTTPException(
-            400, 
-            f"Invalid dates found in month_year column at rows: {invalid_rows}. Sample values: {sample_values}"
-        )
-    
-    df["year"] = df["month_year"].dt.year
-    df["month_year"] = df["month_year"].dt.strftime("%Y-%m-%d")
-    
-    if "year" not in column_order:
-        column_order.append("year")
-    
-    df = df[column_order]
-    
-    years = df["year"].unique()
-    
-    results = {}
-    employees_synced = set()
-    
-    for year in years:
-        year_int = int(year)
-        table_name = f"salaryregister{year_int}"
-        
-        year_data = df[df["year"] == year_int].copy()
-        
-        try:
-            if not table_exists(table_name):
-                column_definitions = {}
-                for col in year_data.columns:
-                    column_definitions[col] = infer_sql_type(year_data[col], col)
-
-                
-                create_salary_table(table_name, column_definitions)
-                results[year_int] = {
-                    "table": table_name,
-                    "status": "created",
-                    "rows": len(year_data)
-                }
-            else:
-                existing_cols = get_table_columns(table_name)
-                new_cols = set(year_data.columns) - existing_cols
-                
-                if new_cols:
-                    for col in new_cols:
-                        col_type = infer_sql_type(year_data[col], col)
-                        add_column(table_name, col, col_type)
-
-                
-                results[year_int] = {
-                    "table": table_name,
-                    "status": "updated",
-                    "rows": len(year_data),
-                    "new_columns": list(new_cols) if new_cols else []
-                }
-            
-            records = json_safe_records(year_data)
-            
-            unique_employees = set()
-            for record in records:
-                emp_key = f"{record.get('person_no')}_{record.get('personnel_area')}"
-                unique_employees.add(emp_key)
-                employees_synced.add(emp_key)
-            
-            insert_salary_register(table_name, records)
-            
-            results[year_int]["unique_employees"] = len(unique_employees)
-            
-        except Exception as e:
-            raise HTTPException(500, f"Error processing year {year_int}: {str(e)}")
-    
-    return {
-        "status": "success",
-        "total_rows_processed": len(df),
-        "employees_synced": len(employees_synced),
-        "years_processed": results
-    }
\ No newline at end of file
+@app.get("/salary/summary")
+def get_salary_summary(
+    year: Optional[int] = None,
+    personnel_area: Optional[List[str]] = Query(None),
+    measures: Optional[str] = None,
+    session=Depends(get_db),
+):
+    """Per (year, month, personnel_area) totals from the salary_monthly_summary rollup"""
+    measure_list = [m.strip() for m in measures.split(",") if m.strip()] if measures else None
+    try:
+        rows = get_monthly_summary(year, personnel_area, measure_list, session)
+    except Exception as e:
+        raise HTTPException(500, f"Error fetching summary: {str(e)}")
+    return {"status": "success", "total_records": len(rows), "data": rows}
+
+
+@app.post("/salary/summary/rebuild/{year}")
+def rebuild_salary_summary(year: int, session=Depends(get_db)):
+    """Recompute the monthly rollup for a whole year table (backfill for data loaded earlier)"""
+    table_name = f"salaryregister{year}"
+    if not table_exists(table_name):
+        raise HTTPException(404, f"No data for year {year}")
+    try:
+        written = rebuild_monthly_summary(table_name, session)
+    except Exception as e:
+        raise HTTPException(500, str(e))
+    return {"status": "success", "year": year, "summary_rows": written}
@@ -0,0 +1,247 @@
+from sqlalchemy import text
+from db import session_scope
+from db_utils import (
+    bulk_upsert,
+    table_exists,
+    table_is_empty,
+    get_table_columns,
+    invalidate_schema_cache,
+    _in_clause,
+    MASTER_LOOKUP_CHUNK_SIZE,
+)
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+
+MANIFEST_TABLE = "upload_manifest"
+PARTITION_TABLE = "upload_partition_manifest"
+ROW_HASH_TABLE = "salary_row_hashes"
+
+
+def ensure_manifest_tables(session):
+    """Create the upload manifest tables if they do not exist yet"""
+    if all(table_exists(t) for t in (MANIFEST_TABLE, PARTITION_TABLE, ROW_HASH_TABLE)):
+        if "years" not in get_table_columns(MANIFEST_TABLE):
+            # Manifests created before uploads recorded the years they cover
+            session.execute(text(f"ALTER TABLE `{MANIFEST_TABLE}` ADD COLUMN `years` VARCHAR(255) NULL"))
+            invalidate_schema_cache(MANIFEST_TABLE)
+        return
+    session.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS `{MANIFEST_TABLE}` (
+            `file_hash` CHAR(64) NOT NULL,
+            `filename` VARCHAR(255) NULL,
+            `rows` INT NOT NULL,
+            `years` VARCHAR(255) NULL,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (`file_hash`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    session.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS `{PARTITION_TABLE}` (
+            `year` INT NOT NULL,
+            `month_year` DATE NOT NULL,
+            `personnel_area` VARCHAR(100) NOT NULL,
+            `partition_hash` CHAR(16) NOT NULL,
+            `row_count` INT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (`year`, `month_year`, `personnel_area`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    session.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS `{ROW_HASH_TABLE}` (
+            `year` INT NOT NULL,
+            `person_no` VARCHAR(100) NOT NULL,
+            `personnel_area` VARCHAR(100) NOT NULL,
+            `month_year` DATE NOT NULL,
+            `row_hash` CHAR(64) NOT NULL,
+            PRIMARY KEY (`year`, `person_no`, `personnel_area`, `month_year`),
+            KEY idx_row_hash_partition (`year`, `month_year`, `personnel_area`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    for table in (MANIFEST_TABLE, PARTITION_TABLE, ROW_HASH_TABLE):
+        invalidate_schema_cache(table)
+
+
+def file_sha256(source) -> str:
+    """SHA-256 of an uploaded file (path or seekable file object), rewinding it afterwards"""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def find_upload(file_hash: str, session=None) -> Optional[Dict]:
+    """
+    Manifest entry of an earlier upload with identical content, if its data is still
+    stored: every year table it wrote must exist and hold rows. Entries that do not
+    record their years cannot be checked and are ignored.
+    """
+    if not table_exists(MANIFEST_TABLE):
+        return None
+    with session_scope(session) as session:
+        row = session.execute(
+            text(f"SELECT * FROM `{MANIFEST_TABLE}` WHERE file_hash = :file_hash"),
+            {"file_hash": file_hash}
+        ).mappings().first()
+        if not row or not row.get("years"):
+            return None
+        for year in row["years"].split(","):
+            table_name = f"salaryregister{year}"
+            if not table_exists(table_name) or table_is_empty(table_name, session):
+                return None
+        return dict(row)
+
+
+def record_upload(file_hash: str, filename: str, rows: int, years: List[int], session=None):
+    with session_scope(session) as session:
+        try:
+            ensure_manifest_tables(session)
+            entry = {"file_hash": file_hash, "filename": filename, "rows": rows,
+                     "years": ",".join(str(y) for y in sorted(years))}
+            bulk_upsert(session, MANIFEST_TABLE, [entry], ["file_hash"])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error recording upload manifest: {e}")
+
+
+def row_hash(record: Dict) -> str:
+    """Content hash of one salary record (column order independent)"""
+    payload = json.dumps(record, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _combine(hashes) -> str:
+    """Order-independent row-set hash: XOR of the leading 64 bits of each row hash"""
+    combined = 0
+    for h in hashes:
+        combined ^= int(h[:16], 16)
+    return f"{combined:016x}"
+
+
+def _partition_key(record: Dict) -> Tuple[str, str]:
+    return str(record.get("month_year")), str(record.get("personnel_area"))
+
+
+def _row_key(record: Dict) -> Tuple[str, str, str]:
+    return str(record.get("person_no")), str(record.get("personnel_area")), str(record.get("month_year"))
+
+
+def _stored_partition_hashes(session, year: int, partitions: List[tuple]) -> Dict[tuple, tuple]:
+    stored = {}
+    for start in range(0, len(partitions), MASTER_LOOKUP_CHUNK_SIZE):
+        params: Dict = {"year": year}
+        in_sql = _in_clause("p", partitions[start:start + MASTER_LOOKUP_CHUNK_SIZE], params)
+        query = text(f"""
+            SELECT month_year, personnel_area, partition_hash, row_count FROM `{PARTITION_TABLE}`
+            WHERE year = :year AND (month_year, personnel_area) IN ({in_sql})
+        """)
+        for row in session.execute(query, params).mappings():
+            stored[(str(row["month_year"]), str(row["personnel_area"]))] = (row["partition_hash"], row["row_count"])
+    return stored
+
+
+def _stored_row_hashes(session, year: int, keys: List[tuple]) -> Dict[tuple, str]:
+    stored = {}
+    for start in range(0, len(keys), MASTER_LOOKUP_CHUNK_SIZE):
+        params: Dict = {"year": year}
+        in_sql = _in_clause("k", keys[start:start + MASTER_LOOKUP_CHUNK_SIZE], params)
+        query = text(f"""
+            SELECT person_no, personnel_area, month_year, row_hash FROM `{ROW_HASH_TABLE}`
+            WHERE year = :year AND (person_no, personnel_area, month_year) IN ({in_sql})
+        """)
+        for row in session.execute(query, params).mappings():
+            stored[(str(row["person_no"]), str(row["personnel_area"]), str(row["month_year"]))] = row["row_hash"]
+    return stored
+
+
+def filter_changed_records(year: int, records: List[Dict], session=None) -> Tuple[List[Dict], List[str], int]:
+    """
+    Drop records whose content is already stored.
+    Partitions whose row-set hash matches the manifest are skipped without
+    touching row hashes; for the rest, rows are compared one by one.
+    Returns (changed_records, their_hashes, unchanged_count).
+    """
+    if not records or not table_exists(ROW_HASH_TABLE):
+        return records, [row_hash(r) for r in records], 0
+
+    hashes = [row_hash(r) for r in records]
+    partitions: Dict[tuple, List[int]] = {}
+    for i, record in enumerate(records):
+        partitions.setdefault(_partition_key(record), []).append(i)
+
+    with session_scope(session) as session:
+        stored_parts = _stored_partition_hashes(session, year, list(partitions.keys()))
+        candidates = []
+        for part, idxs in partitions.items():
+            current = (_combine(hashes[i] for i in idxs), len(idxs))
+            if stored_parts.get(part) != current:
+                candidates.extend(idxs)
+
+        stored_rows = _stored_row_hashes(session, year, [_row_key(records[i]) for i in candidates])
+
+    changed = [i for i in candidates if stored_rows.get(_row_key(records[i])) != hashes[i]]
+    return [records[i] for i in changed], [hashes[i] for i in changed], len(records) - len(changed)
+
+
+def save_row_hashes(year: int, records: List[Dict], hashes: List[str], session=None):
+    """Store hashes of freshly written rows and refresh the row-set hash of their partitions"""
+    if not records:
+        return
+    with session_scope(session) as session:
+        try:
+            ensure_manifest_tables(session)
+            rows = [
+                {"year": year, "person_no": r.get("person_no"), "personnel_area": r.get("personnel_area"),
+                 "month_year": r.get("month_year"), "row_hash": h}
+                for r, h in zip(records, hashes)
+            ]
+            bulk_upsert(session, ROW_HASH_TABLE, rows, ["year", "person_no", "personnel_area", "month_year"])
+
+            partitions = list({_partition_key(r) for r in records})
+            partition_rows = []
+            for start in range(0, len(partitions), MASTER_LOOKUP_CHUNK_SIZE):
+                params: Dict = {"year": year}
+                in_sql = _in_clause("p", partitions[start:start + MASTER_LOOKUP_CHUNK_SIZE], params)
+                query = text(f"""
+                    SELECT month_year, personnel_area, row_hash FROM `{ROW_HASH_TABLE}`
+                    WHERE year = :year AND (month_year, personnel_area) IN ({in_sql})
+                """)
+                grouped: Dict[tuple, List[str]] = {}
+                for row in session.execute(query, params).mappings():
+                    grouped.setdefault((row["month_year"], row["personnel_area"]), []).append(row["row_hash"])
+                for (month_year, area), part_hashes in grouped.items():
+                    partition_rows.append({
+                        "year": year, "month_year": month_year, "personnel_area": area,
+                        "partition_hash": _combine(part_hashes), "row_count": len(part_hashes)
+                    })
+            bulk_upsert(session, PARTITION_TABLE, partition_rows, ["year", "month_year", "personnel_area"])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error saving row hashes: {e}")
+
+
+def clear_year_hashes(year: int, session=None):
+    """
+    Forget the stored row and partition hashes of a year. Called when its table
+    is (re)created, so hashes left from dropped or emptied data cannot mark rows as unchanged.
+    """
+    if not table_exists(ROW_HASH_TABLE):
+        return
+    with session_scope(session) as session:
+        try:
+            for table in (ROW_HASH_TABLE, PARTITION_TABLE):
+                session.execute(text(f"DELETE FROM `{table}` WHERE year = :year"), {"year": year})
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise Exception(f"Failed to clear row hashes for {year}: {str(e)}")
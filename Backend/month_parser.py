@@ -0,0 +1,94 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Sequence
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Formats tried when detecting a file's month_year format. Ambiguous numeric
+# formats are listed month-first, matching pandas' default interpretation.
+MONTH_YEAR_FORMATS = (
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%B %Y",
+    "%b %Y",
+    "%B-%Y",
+    "%b-%Y",
+    "%Y-%m",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%m.%d.%Y",
+    "%d.%m.%Y",
+    "%m/%Y",
+)
+
+# Distinct values inspected when detecting the format
+FORMAT_SAMPLE_SIZE = 50
+
+
+def detect_month_format(values: Sequence[str]) -> Optional[str]:
+    """First candidate format that parses every sampled value, or None"""
+    sample = [v for v in values if v][:FORMAT_SAMPLE_SIZE]
+    if not sample:
+        return None
+    for fmt in MONTH_YEAR_FORMATS:
+        try:
+            for value in sample:
+                datetime.strptime(value, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_value(value: str, fmt: Optional[str]):
+    """Parse one distinct month_year string; NaT when nothing understands it"""
+    if fmt:
+        try:
+            return pd.Timestamp(datetime.strptime(value, fmt))
+        except ValueError:
+            pass
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(value, format="mixed", errors="coerce")
+    if pd.isna(parsed):
+        # e.g. "January 2025"
+        parsed = pd.to_datetime(value, format="%B %Y", errors="coerce")
+    return parsed
+
+
+def _parse_other(value):
+    try:
+        return pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return pd.NaT
+
+
+def parse_month_year(series: pd.Series) -> pd.Series:
+    """
+    Parse a month_year column to datetime64, NaT where unparseable.
+    Only distinct values are parsed (a payroll file has ~12), then mapped back
+    to the rows through factorize codes, so the cost is O(distinct months).
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    if pd.api.types.is_numeric_dtype(series):
+        # Excel serial day numbers (e.g. .xlsb, which carries no date typing)
+        return pd.to_datetime(series, unit="D", origin="1899-12-30", errors="coerce")
+
+    codes, uniques = pd.factorize(series)
+    uniques = list(uniques)
+    fmt = detect_month_format([v.strip() for v in uniques if isinstance(v, str)])
+
+    parsed_uniques = pd.DatetimeIndex([
+        _parse_value(v.strip(), fmt) if isinstance(v, str) else _parse_other(v)
+        for v in uniques
+    ] + [pd.NaT])
+
+    # factorize marks missing values with -1, which picks the trailing NaT
+    return pd.Series(parsed_uniques.take(np.where(codes < 0, len(uniques), codes)), index=series.index)
@@ -0,0 +1,46 @@
+from functools import lru_cache
+from typing import Dict, Tuple
+import re
+
+# Header characters and what they become in a column name
+_CHAR_REPLACEMENTS = {
+    " ": "_", "-": "_", ".": "_", "/": "_", "\\": "_", ":": "_", ";": "_", ",": "_", "|": "_",
+    "(": "", ")": "", "'": "", '"': "", "*": "", "=": "", "<": "", ">": "",
+    "?": "", "!": "", "$": "", "^": "", "[": "", "]": "", "{": "", "}": "",
+    "&": "and", "%": "percent", "#": "num", "@": "at", "+": "plus",
+}
+_TRANSLATION = str.maketrans(_CHAR_REPLACEMENTS)
+_REPEATED_UNDERSCORES = re.compile(r"_+")
+
+# Normalized header -> canonical column name
+RENAME_RULES: Dict[str, str] = {
+    "name_of_employee": "employee_name",
+    "basic": "basic_salary",
+    "month": "month_year",
+}
+
+
+def register_rename_rule(source: str, target: str):
+    """Map a normalized header to a canonical column name for all later uploads"""
+    RENAME_RULES[normalize_header(source)] = target
+    normalize_columns.cache_clear()
+
+
+def normalize_header(header) -> str:
+    """Lower-case, strip and replace special characters; no rename rules applied"""
+    normalized = str(header).lower().strip().translate(_TRANSLATION)
+    return _REPEATED_UNDERSCORES.sub("_", normalized).strip("_")
+
+
+@lru_cache(maxsize=256)
+def normalize_columns(headers: Tuple) -> Tuple[str, ...]:
+    """
+    Normalize a full header row and apply the rename rules.
+    Cached per raw header tuple: the same SAP headers arrive every month.
+    """
+    names = []
+    for header in headers:
+        normalized = normalize_header(header)
+        names.append(RENAME_RULES.get(normalized, normalized))
+    return tuple(names)
+
@@ -0,0 +1,99 @@
+from typing import Dict, Iterator, List, Optional
+import os
+
+import pandas as pd
+
+SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".xlsb", ".csv")
+
+# Rows per chunk when streaming an upload (bounds peak memory)
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "20000"))
+
+
+def _rows_to_frame(header: List[str], rows: List[tuple]) -> pd.DataFrame:
+    return pd.DataFrame.from_records(rows, columns=header).infer_objects()
+
+
+def _header(cells) -> List[str]:
+    """Header row named like pd.read_excel: blanks become "Unnamed: i", repeats get .1, .2, ..."""
+    names = [str(v) if v is not None and v != "" else f"Unnamed: {i}" for i, v in enumerate(cells)]
+    # Same renaming as pandas' header parser: a repeat skips suffixes already in the header
+    counts: Dict[str, int] = {}
+    for i, name in enumerate(names):
+        original = name
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def _iter_row_chunks(rows, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Group an iterator of row tuples (header first) into DataFrames of chunk_rows rows"""
+    header = None
+    buffer = []
+    start = 0
+    for values in rows:
+        if header is None:
+            header = _header(values)
+            continue
+        if all(v is None or v == "" for v in values):
+            continue
+        buffer.append(tuple(values[:len(header)]) + (None,) * (len(header) - len(values)))
+        if len(buffer) >= chunk_rows:
+            frame = _rows_to_frame(header, buffer)
+            frame.index = range(start, start + len(frame))
+            start += len(frame)
+            yield frame
+            buffer = []
+    if header is not None and buffer:
+        frame = _rows_to_frame(header, buffer)
+        frame.index = range(start, start + len(frame))
+        yield frame
+
+
+def _iter_xlsx(source, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        yield from _iter_row_chunks(sheet.iter_rows(values_only=True), chunk_rows)
+    finally:
+        workbook.close()
+
+
+def _iter_xlsb(source, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    try:
+        from pyxlsb import open_workbook
+    except ImportError:
+        raise ValueError("Reading .xlsb files requires the pyxlsb package")
+
+    with open_workbook(source) as workbook:
+        with workbook.get_sheet(1) as sheet:
+            rows = ([cell.v for cell in row] for row in sheet.rows())
+            yield from _iter_row_chunks(rows, chunk_rows)
+
+
+def iter_salary_chunks(source, filename: str, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read an uploaded salary file as DataFrames of at most chunk_rows rows.
+    .xlsx (openpyxl read-only), .xlsb and .csv are streamed; legacy .xls has
+    no streaming reader and is loaded once, then sliced.
+    The index keeps counting across chunks so row numbers match the file.
+    """
+    chunk_rows = chunk_rows or UPLOAD_CHUNK_ROWS
+    extension = os.path.splitext(filename.lower())[1]
+
+    if extension == ".csv":
+        yield from pd.read_csv(source, chunksize=chunk_rows)
+    elif extension == ".xlsx":
+        yield from _iter_xlsx(source, chunk_rows)
+    elif extension == ".xlsb":
+        yield from _iter_xlsb(source, chunk_rows)
+    else:
+        df = pd.read_excel(source)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
@@ -0,0 +1,160 @@
+"""normalize_columns must produce exactly the names the pre-normalizer upload code produced"""
+import re
+
+import pandas as pd
+import pytest
+
+import normalizer
+from normalizer import normalize_columns, normalize_header, register_rename_rule
+
+LEGACY_RENAME_MAP = {
+    "name_of_employee": "employee_name",
+    "basic": "basic_salary",
+    "month": "month_year"
+}
+
+SAP_HEADERS = [
+    "Person No.", "Name of Employee", "Personnel Area", "Month", "Basic", "Designation",
+    "Personnel Sub-Area", "Emp. Sub-Group", "Pay Scale Type", "Bank A/c No.", "IFSC Code",
+    "PF No.", "Aadhar No", "PAN No.", "Cost Center #", "Profit Center", "HRA (Arrear)",
+    "D.A. %", "PF / VPF", "  Net Pay  ", "Income Tax@Source", "LIC+GSLI", "Deduction*",
+    "Total (A+B)", "Leave Encash = Days", "P&L Ded'n", "Adj. <Prev Month>", "Is Active?",
+    "Bonus!", "Amt $", "Rate^2", "Code|Sub", "Ded [Old]", "Misc {x}", 'Quote "A"',
+    "Path\\X", "Time:Hrs", "A;B", "a,b", "__lead__", "Multi   Space", "--", "BASIC",
+    "month", "Name Of Employee",
+]
+
+
+def legacy_dataframe_columns(headers):
+    """The .str.replace chain that renamed the DataFrame columns"""
+    df = pd.DataFrame(columns=headers)
+    df.columns = (
+        df.columns.astype(str)
+        .str.lower()
+        .str.strip()
+        .str.replace(" ", "_", regex=False)
+        .str.replace("-", "_", regex=False)
+        .str.replace(".", "_", regex=False)
+        .str.replace("(", "", regex=False)
+        .str.replace(")", "", regex=False)
+        .str.replace("/", "_", regex=False)
+        .str.replace("\\", "_", regex=False)
+        .str.replace(":", "_", regex=False)
+        .str.replace(";", "_", regex=False)
+        .str.replace(",", "_", regex=False)
+        .str.replace("'", "", regex=False)
+        .str.replace('"', "", regex=False)
+        .str.replace("&", "and", regex=False)
+        .str.replace("%", "percent", regex=False)
+        .str.replace("#", "num", regex=False)
+        .str.replace("@", "at", regex=False)
+        .str.replace("+", "plus", regex=False)
+        .str.replace("*", "", regex=False)
+        .str.replace("=", "", regex=False)
+        .str.replace("<", "", regex=False)
+        .str.replace(">", "", regex=False)
+        .str.replace("?", "", regex=False)
+        .str.replace("!", "", regex=False)
+        .str.replace("$", "", regex=False)
+        .str.replace("^", "", regex=False)
+        .str.replace("|", "_", regex=False)
+        .str.replace("[", "", regex=False)
+        .str.replace("]", "", regex=False)
+        .str.replace("{", "", regex=False)
+        .str.replace("}", "", regex=False)
+    )
+    df.columns = df.columns.str.replace(r'_+', '_', regex=True)
+    df.columns = df.columns.str.strip('_')
+    df.rename(columns=LEGACY_RENAME_MAP, inplace=True)
+    return df.columns.tolist()
+
+
+def legacy_column_order(headers):
+    """The per-header .replace loop that built column_order"""
+    column_order = []
+    for orig_col in headers:
+        normalized = (orig_col.lower().strip()
+                      .replace(" ", "_")
+                      .replace("-", "_")
+                      .replace(".", "_")
+                      .replace("(", "")
+                      .replace(")", "")
+                      .replace("/", "_")
+                      .replace("\\", "_")
+                      .replace(":", "_")
+                      .replace(";", "_")
+                      .replace(",", "_")
+                      .replace("'", "")
+                      .replace('"', "")
+                      .replace("&", "and")
+                      .replace("%", "percent")
+                      .replace("#", "num")
+                      .replace("@", "at")
+                      .replace("+", "plus")
+                      .replace("*", "")
+                      .replace("=", "")
+                      .replace("<", "")
+                      .replace(">", "")
+                      .replace("?", "")
+                      .replace("!", "")
+                      .replace("$", "")
+                      .replace("^", "")
+                      .replace("|", "_")
+                      .replace("[", "")
+                      .replace("]", "")
+                      .replace("{", "")
+                      .replace("}", ""))
+        normalized = re.sub(r'_+', '_', normalized).strip('_')
+        column_order.append(LEGACY_RENAME_MAP.get(normalized, normalized))
+    return column_order
+
+
+@pytest.fixture(autouse=True)
+def restore_rules():
+    rules = dict(normalizer.RENAME_RULES)
+    normalize_columns.cache_clear()
+    yield
+    normalizer.RENAME_RULES.clear()
+    normalizer.RENAME_RULES.update(rules)
+    normalize_columns.cache_clear()
+
+
+def test_matches_legacy_dataframe_chain():
+    assert list(normalize_columns(tuple(SAP_HEADERS))) == legacy_dataframe_columns(SAP_HEADERS)
+
+
+def test_matches_legacy_column_order_loop():
+    assert list(normalize_columns(tuple(SAP_HEADERS))) == legacy_column_order(SAP_HEADERS)
+
+
+@pytest.mark.parametrize("header", SAP_HEADERS)
+def test_each_header_matches_legacy(header):
+    assert normalize_columns((header,)) == tuple(legacy_column_order([header]))
+
+
+def test_non_string_headers_match_dataframe_chain():
+    headers = [2024, 1.5, "Person No."]
+    assert list(normalize_columns(tuple(headers))) == legacy_dataframe_columns(headers)
+
+
+def test_normalize_header_skips_rename_rules():
+    assert normalize_header("Name of Employee") == "name_of_employee"
+    assert normalize_columns(("Name of Employee",)) == ("employee_name",)
+
+
+def test_repeated_headers_are_served_from_cache():
+    headers = tuple(SAP_HEADERS)
+    normalize_columns(headers)
+    normalize_columns(headers)
+    info = normalize_columns.cache_info()
+    assert info.hits == 1 and info.misses == 1
+
+
+def test_register_rename_rule_clears_cache():
+    headers = ("Person No.", "Gross Pay (Total)")
+    assert normalize_columns(headers) == ("person_no", "gross_pay_total")
+
+    register_rename_rule("Gross Pay (Total)", "gross_pay")
+
+    assert normalize_columns.cache_info().currsize == 0
+    assert normalize_columns(headers) == ("person_no", "gross_pay")
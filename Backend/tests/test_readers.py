@@ -0,0 +1,44 @@
+"""Streaming readers must name columns the way pd.read_excel does"""
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from normalizer import normalize_columns
+from readers import iter_salary_chunks
+
+
+def write_xlsx(path, header, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+@pytest.mark.parametrize("header", [
+    ["Person No", "Arrear", "Arrear", "Personnel Area"],
+    ["A", "A", "A.1", "A", None, "B", "B"],
+])
+def test_duplicate_headers_match_read_excel(tmp_path, header):
+    path = tmp_path / "salary.xlsx"
+    rows = [[f"{r}-{c}" for c in range(len(header))] for r in range(7)]
+    write_xlsx(path, header, rows)
+
+    chunks = list(iter_salary_chunks(str(path), "salary.xlsx", chunk_rows=3))
+    expected = pd.read_excel(path)
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    for chunk in chunks:
+        assert chunk.columns.tolist() == expected.columns.tolist()
+    assert pd.concat(chunks).values.tolist() == expected.values.tolist()
+
+
+def test_duplicate_headers_stay_distinct_after_normalizing(tmp_path):
+    path = tmp_path / "salary.xlsx"
+    write_xlsx(path, ["Person No", "Arrear", "Arrear"], [["1", 10, 20.5]])
+
+    chunk = next(iter_salary_chunks(str(path), "salary.xlsx"))
+
+    assert normalize_columns(tuple(chunk.columns)) == ("person_no", "arrear", "arrear_1")
+    assert chunk.iloc[0].tolist() == ["1", 10, 20.5]
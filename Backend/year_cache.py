@@ -0,0 +1,308 @@
+from sqlalchemy import text
+from db import session_scope
+from db_utils import (
+    table_exists,
+    invalidate_schema_cache,
+    summary_measures,
+    _parse_month_bound,
+    SALARY_KEY_COLUMNS,
+    SUMMARY_ROW_COUNT,
+)
+from exporters import write_parquet
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import glob
+import os
+import tempfile
+import threading
+import time
+
+# Parquet snapshots of closed (past) years, answered without touching MySQL.
+# Disabled automatically when pyarrow is not installed.
+YEAR_CACHE_ENABLED = os.getenv("YEAR_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+YEAR_CACHE_DIR = os.getenv("YEAR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ecl_year_cache"))
+
+# Seconds a year's version stamp is trusted before it is re-read from MySQL
+# (uploads in this process bump it immediately)
+YEAR_CACHE_VERSION_TTL = float(os.getenv("YEAR_CACHE_VERSION_TTL", "30"))
+
+VERSION_TABLE = "salary_year_versions"
+
+# Position of each row in a snapshot. Snapshots are written in the year table's
+# primary-key order (MySQL collation), so file order is the order pages are served in.
+ROW_COLUMN = "_row"
+
+_lock = threading.Lock()
+_versions: Dict[int, Tuple[float, int]] = {}
+_building = set()
+_builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="year-cache")
+
+try:
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:
+    pc = ds = pafs = pq = None
+
+
+def cache_available() -> bool:
+    return YEAR_CACHE_ENABLED and pq is not None
+
+
+def is_closed_year(year: int) -> bool:
+    """Past calendar years are closed; the current one is always read from MySQL"""
+    return year < date.today().year
+
+
+def ensure_version_table(session):
+    if table_exists(VERSION_TABLE):
+        return
+    session.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS `{VERSION_TABLE}` (
+            `year` INT NOT NULL,
+            `version` BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (`year`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    invalidate_schema_cache(VERSION_TABLE)
+
+
+def bump_year_version(session, year: int):
+    """Mark a year's data as changed so its snapshot is rebuilt; the caller commits"""
+    ensure_version_table(session)
+    session.execute(text(f"""
+        INSERT INTO `{VERSION_TABLE}` (`year`, `version`) VALUES (:year, 1)
+        ON DUPLICATE KEY UPDATE `version` = `version` + 1
+    """), {"year": year})
+    with _lock:
+        _versions.pop(year, None)
+
+
+def get_year_version(year: int, session=None) -> int:
+    with _lock:
+        cached = _versions.get(year)
+        if cached and time.monotonic() - cached[0] < YEAR_CACHE_VERSION_TTL:
+            return cached[1]
+    version = 0
+    if table_exists(VERSION_TABLE):
+        with session_scope(session) as session:
+            version = session.execute(
+                text(f"SELECT `version` FROM `{VERSION_TABLE}` WHERE `year` = :year"), {"year": year}
+            ).scalar() or 0
+    with _lock:
+        _versions[year] = (time.monotonic(), version)
+    return version
+
+
+def snapshot_path(year: int, version: int) -> str:
+    return os.path.join(YEAR_CACHE_DIR, f"salaryregister{year}-v{version}.parquet")
+
+
+def _numbered(rows: Iterable[Dict]) -> Iterable[Dict]:
+    for position, row in enumerate(rows):
+        row[ROW_COLUMN] = position
+        yield row
+
+
+def _build_snapshot(year: int, version: int, source: Callable[[], Tuple[Dict[str, str], Iterable[Dict]]]):
+    try:
+        os.makedirs(YEAR_CACHE_DIR, exist_ok=True)
+        column_types, rows = source()
+        path = snapshot_path(year, version)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        write_parquet(_numbered(rows), {**column_types, ROW_COLUMN: "BIGINT"}, tmp_path)
+        os.replace(tmp_path, path)
+        for stale in glob.glob(os.path.join(YEAR_CACHE_DIR, f"salaryregister{year}-v*.parquet")):
+            if stale != path:
+                os.remove(stale)
+    except Exception as e:
+        print(f"Error building year cache for {year}: {e}")
+    finally:
+        with _lock:
+            _building.discard((year, version))
+
+
+def snapshot_for(year: int, source: Callable[[], Tuple[Dict[str, str], Iterable[Dict]]]) -> Optional[str]:
+    """
+    Path of a fresh Parquet snapshot of a closed year, or None when the caller
+    must read MySQL. A missing or outdated snapshot is (re)built in the
+    background from source() -> (column_types, rows).
+    """
+    if not cache_available() or not is_closed_year(year):
+        return None
+    version = get_year_version(year)
+    path = snapshot_path(year, version)
+    if os.path.exists(path):
+        return path
+    with _lock:
+        if (year, version) in _building:
+            return None
+        _building.add((year, version))
+    _builder.submit(_build_snapshot, year, version, source)
+    return None
+
+
+def drop_snapshots(year: Optional[int] = None) -> int:
+    pattern = f"salaryregister{year}-v*.parquet" if year is not None else "salaryregister*-v*.parquet"
+    paths = glob.glob(os.path.join(YEAR_CACHE_DIR, pattern))
+    for path in paths:
+        os.remove(path)
+    return len(paths)
+
+
+def _open(path: str):
+    """Memory-mapped Arrow dataset over one snapshot file"""
+    return ds.dataset(path, format="parquet", filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+
+def _ci(field: str):
+    """Lower-cased column: the schema's utf8mb4_unicode_ci comparisons ignore case"""
+    return pc.utf8_lower(ds.field(field))
+
+
+def _filter_expression(filters: Dict, names: List[str]):
+    """Arrow predicate equivalent to build_salary_query's WHERE clause (pushed into the Parquet scan)"""
+    conditions = []
+    if filters.get("personnel_area"):
+        conditions.append(_ci("personnel_area").isin([str(a).lower() for a in filters["personnel_area"]]))
+    for key, end in (("month_from", False), ("month_to", True)):
+        if filters.get(key):
+            op, bound = _parse_month_bound(filters[key], end=end)
+            field = ds.field("month_year")
+            conditions.append({">=": field >= bound, "<": field < bound, "<=": field <= bound}[op])
+    if filters.get("person_no"):
+        conditions.append(pc.starts_with(ds.field("person_no"), pattern=filters["person_no"], ignore_case=True))
+    if filters.get("name"):
+        if "employee_name" not in names:
+            raise ValueError("Table has no employee_name column")
+        conditions.append(pc.starts_with(ds.field("employee_name"), pattern=filters["name"], ignore_case=True))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _cursor_position(dataset, after: tuple) -> Optional[int]:
+    """Snapshot position of the row a keyset cursor points at, None if it is not in the snapshot"""
+    person_no, personnel_area, month_year = after
+    month_year = datetime.strptime(str(month_year)[:10], "%Y-%m-%d").date()
+    found = dataset.to_table(columns=[ROW_COLUMN], filter=(
+        (ds.field("person_no") == str(person_no)) & (ds.field("personnel_area") == str(personnel_area))
+        & (ds.field("month_year") == month_year)
+    ))
+    return found[ROW_COLUMN][0].as_py() if found.num_rows else None
+
+
+def _sort_keys(order_by: str, schema) -> Optional[List[tuple]]:
+    """
+    Arrow sort keys reproducing build_salary_query's ORDER BY (NULLs first ascending,
+    last descending), or None for text columns, which MySQL sorts by collation.
+    Ties keep file (primary-key) order, as MySQL's primary-key tie-breaker does,
+    because the sort is stable.
+    """
+    import pyarrow as pa
+
+    keys = []
+    for item in order_by.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        col = item.lstrip("-+")
+        if col not in schema.names or col == ROW_COLUMN:
+            raise ValueError(f"Unknown order_by column: {col}")
+        if pa.types.is_string(schema.field(col).type):
+            return None
+        keys.append((col, "descending", "at_end") if item.startswith("-") else (col, "ascending", "at_start"))
+    return keys
+
+
+def query_snapshot(path: str, filters: Optional[Dict] = None, fields: Optional[List[str]] = None,
+                   order_by: Optional[str] = None, after: Optional[tuple] = None,
+                   limit: Optional[int] = None) -> Optional[List[Dict]]:
+    """
+    get_salary_page over a memory-mapped snapshot: same filters, projection, order and
+    keyset paging. Pages read in file order and stop scanning once `limit` rows matched.
+    Returns None when the request has to be answered by MySQL (see _sort_keys, or a
+    cursor whose row is not in the snapshot).
+    """
+    filters = filters or {}
+    dataset = _open(path)
+    if ROW_COLUMN not in dataset.schema.names:
+        return None
+    names = [n for n in dataset.schema.names if n != ROW_COLUMN]
+    columns = names
+    if fields:
+        unknown = [f for f in fields if f not in names]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+        columns = list(dict.fromkeys(fields))
+        if after is not None or limit is not None:
+            columns += [c for c in SALARY_KEY_COLUMNS if c not in columns]
+
+    expression = _filter_expression(filters, names)
+    if after:
+        position = _cursor_position(dataset, after)
+        if position is None:
+            return None
+        resume = ds.field(ROW_COLUMN) > position
+        expression = resume if expression is None else expression & resume
+
+    if order_by:
+        keys = _sort_keys(order_by, dataset.schema)
+        if keys is None:
+            return None
+        scan_columns = list(dict.fromkeys(columns + [key[0] for key in keys]))
+        table = dataset.to_table(columns=scan_columns, filter=expression).sort_by(keys)
+        if limit is not None:
+            table = table.slice(0, limit)
+        return table.select(columns).to_pylist()
+
+    if limit is None:
+        return dataset.to_table(columns=columns, filter=expression).to_pylist()
+
+    # Batches come back in file order; stop as soon as the page is full
+    rows: List[Dict] = []
+    for batch in dataset.scanner(columns=columns, filter=expression).to_batches():
+        rows.extend(batch.slice(0, limit - len(rows)).to_pylist())
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def aggregate_snapshot(path: str, year: int, measures: Optional[List[str]] = None,
+                       personnel_area: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Per (month, personnel_area) totals from a snapshot, shaped like get_monthly_summary
+    rows and limited to the same measures the salary_monthly_summary rollup keeps
+    """
+    import pyarrow as pa
+
+    dataset = _open(path)
+    numeric = summary_measures([
+        field.name for field in dataset.schema
+        if field.name not in ("year", ROW_COLUMN)
+        and (pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or pa.types.is_decimal(field.type))
+    ])
+    if measures:
+        numeric = [m for m in numeric if m in measures]
+    expression = None
+    if personnel_area:
+        expression = _ci("personnel_area").isin([str(a).lower() for a in personnel_area])
+    table = dataset.to_table(columns=["month_year", "personnel_area"] + numeric, filter=expression)
+    grouped = table.group_by(["month_year", "personnel_area"]).aggregate(
+        [("month_year", "count")] + [(m, "sum") for m in numeric]
+    )
+
+    rows = []
+    for group in grouped.to_pylist():
+        base = {"year": year, "month_year": group["month_year"], "personnel_area": group["personnel_area"]}
+        if not measures or SUMMARY_ROW_COUNT in measures:
+            rows.append({**base, "measure": SUMMARY_ROW_COUNT, "total": group["month_year_count"],
+                         "row_count": group["month_year_count"]})
+        for m in numeric:
+            rows.append({**base, "measure": m, "total": group[f"{m}_sum"], "row_count": group["month_year_count"]})
+    rows.sort(key=lambda r: (r["month_year"], r["personnel_area"], r["measure"]))
+    return rows
@@ -21,10 +21,71 @@ export async function uploadSalary(file: File) {
 }
 
 /* =========================
-   GET: SELECT * salary table
+   POST: Upload salary file as a background job
    ========================= */
-export async function fetchAllSalary(year: number) {
-  const response = await fetch(`${API_BASE}/salary/all/${year}`, {
+export async function uploadSalaryInBackground(file: File) {
+  const formData = new FormData();
+  formData.append("file", file);
+
+  const response = await fetch(`${API_BASE}/upload/salary-xlsx?background=true`, {
+    method: "POST",
+    body: formData,
+  });
+
+  if (!response.ok) {
+    const err = await response.text();
+    throw new Error(err || "Upload failed");
+  }
+
+  return response.json();
+}
+
+/* =========================
+   GET: background job status
+   ========================= */
+export async function fetchJob(jobId: string) {
+  const response = await fetch(`${API_BASE}/jobs/${jobId}`, {
+    headers: {
+      Accept: "application/json",
+    },
+  });
+
+  if (!response.ok) {
+    const err = await response.text();
+    throw new Error(err || "Failed to fetch job status");
+  }
+
+  return response.json();
+}
+
+/* =========================
+   GET: salary table (optionally filtered server-side)
+   ========================= */
+export interface SalaryQuery {
+  personnel_area?: string[];
+  month_from?: string;
+  month_to?: string;
+  person_no?: string;
+  name?: string;
+  fields?: string[];
+  order_by?: string;
+}
+
+function salaryQueryString(query: SalaryQuery = {}) {
+  const params = new URLSearchParams();
+  query.personnel_area?.forEach((area) => params.append("personnel_area", area));
+  if (query.month_from) params.set("month_from", query.month_from);
+  if (query.month_to) params.set("month_to", query.month_to);
+  if (query.person_no) params.set("person_no", query.person_no);
+  if (query.name) params.set("name", query.name);
+  if (query.fields?.length) params.set("fields", query.fields.join(","));
+  if (query.order_by) params.set("order_by", query.order_by);
+  const qs = params.toString();
+  return qs ? `?${qs}` : "";
+}
+
+export async function fetchAllSalary(year: number, query?: SalaryQuery) {
+  const response = await fetch(`${API_BASE}/salary/all/${year}${salaryQueryString(query)}`, {
     headers: {
       Accept: "application/json",
     },
@@ -37,3 +98,84 @@ export async function fetchAllSalary(year: number) {
 
   return response.json();
 }
+
+/* =========================
+   GET: fiscal year (Apr-Mar) totals per employee
+   ========================= */
+export async function fetchFinancialYearTotals(fyStart: number, personnelArea?: string[]) {
+  const params = new URLSearchParams();
+  personnelArea?.forEach((area) => params.append("personnel_area", area));
+  const qs = params.toString();
+
+  const response = await fetch(`${API_BASE}/salary/fy/${fyStart}${qs ? `?${qs}` : ""}`, {
+    headers: {
+      Accept: "application/json",
+    },
+  });
+
+  if (!response.ok) {
+    const err = await response.text();
+    throw new Error(err || "Failed to fetch financial year data");
+  }
+
+  return response.json();
+}
+
+/* =========================
+   POST: employee details for many keys at once
+   ========================= */
+export interface EmployeeKey {
+  person_no: string;
+  personnel_area: string;
+}
+
+export async function lookupEmployees(keys: EmployeeKey[]) {
+  const response = await fetch(`${API_BASE}/employees/lookup`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "application/json",
+    },
+    body: JSON.stringify({ keys }),
+  });
+
+  if (!response.ok) {
+    const err = await response.text();
+    throw new Error(err || "Failed to look up employees");
+  }
+
+  return response.json();
+}
+
+/* =========================
+   GET: server-side export of a year (use as a download link)
+   ========================= */
+export type SalaryExportFormat = "csv" | "parquet" | "xlsx";
+
+export function salaryExportUrl(year: number, format: SalaryExportFormat = "csv", query?: SalaryQuery) {
+  const qs = salaryQueryString(query);
+  return `${API_BASE}/salary/export/${year}${qs ? `${qs}&` : "?"}format=${format}`;
+}
+
+/* =========================
+   GET: monthly totals across several years
+   ========================= */
+export async function fetchSalaryTrend(years: number[], measures?: string[], personnelArea?: string[]) {
+  const params = new URLSearchParams();
+  years.forEach((year) => params.append("years", String(year)));
+  personnelArea?.forEach((area) => params.append("personnel_area", area));
+  if (measures?.length) params.set("measures", measures.join(","));
+
+  const response = await fetch(`${API_BASE}/salary/trend?${params.toString()}`, {
+    headers: {
+      Accept: "application/json",
+    },
+  });
+
+  if (!response.ok) {
+    const err = await response.text();
+    throw new Error(err || "Failed to fetch salary trend");
+  }
+
+  return response.json();
+}